@@ -1,36 +1,133 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
 from typing import cast
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from crud import get_user_by_username, fake_hash_password
-from database import AsyncSessionLocal, get_session
+from crud import get_cached_user, fake_hash_password
+from database import get_session
 from schemas import UserOut
 
+logger = logging.getLogger("assignments.auth")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+ACCESS_TOKEN_TTL_SECONDS = int(os.environ.get("ACCESS_TOKEN_TTL_SECONDS", "3600"))
+TOKEN_VERSION = "v1"
+
+
+# Published in this file, so only usable when AUTH_INSECURE_DEV_KEY=1 is set
+INSECURE_DEV_SIGNING_KEYS = "dev:insecure-dev-signing-key"
+
+# Unsigned "token-<username>" bearer tokens name a user without proving
+# anything; they are refused unless AUTH_ALLOW_LEGACY_TOKENS=1.
+ALLOW_LEGACY_TOKENS = os.environ.get("AUTH_ALLOW_LEGACY_TOKENS") == "1"
+if ALLOW_LEGACY_TOKENS:
+    logger.warning("AUTH_ALLOW_LEGACY_TOKENS is deprecated: unsigned token-<username> bearer tokens are accepted")
+
+
+def _load_signing_keys() -> dict[str, bytes]:
+    # AUTH_SIGNING_KEYS="kid:secret,kid:secret". The first key signs new tokens and
+    # every listed key still verifies, so keys rotate by prepending a new one and
+    # dropping the old one once its tokens have expired.
+    raw = os.environ.get("AUTH_SIGNING_KEYS")
+    if not raw:
+        if os.environ.get("AUTH_INSECURE_DEV_KEY") != "1":
+            raise RuntimeError("AUTH_SIGNING_KEYS is not set (AUTH_INSECURE_DEV_KEY=1 allows a public development key)")
+        logger.warning("signing tokens with the public development key: anyone can forge them")
+        raw = INSECURE_DEV_SIGNING_KEYS
+    keys: dict[str, bytes] = {}
+    for entry in raw.split(","):
+        kid, sep, secret = entry.strip().partition(":")
+        if not sep or not kid or not secret or "." in kid:
+            raise RuntimeError(f"malformed AUTH_SIGNING_KEYS entry for key id {kid!r}")
+        keys[kid] = secret.encode()
+    return keys
+
+
+SIGNING_KEYS = _load_signing_keys()
+ACTIVE_KEY_ID = next(iter(SIGNING_KEYS))
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(key: bytes, signing_input: str) -> str:
+    return _b64encode(hmac.new(key, signing_input.encode(), hashlib.sha256).digest())
+
+
+def issue_access_token(user: UserOut, now: float | None = None) -> str:
+    """Return a signed ``v1.<kid>.<payload>.<signature>`` token carrying the user's identity."""
+    issued_at = int(time.time() if now is None else now)
+    payload = {
+        "sub": user.id,
+        "username": user.username,
+        "full_name": user.full_name,
+        "exp": issued_at + ACCESS_TOKEN_TTL_SECONDS,
+    }
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    signing_input = f"{TOKEN_VERSION}.{ACTIVE_KEY_ID}.{body}"
+    return f"{signing_input}.{_sign(SIGNING_KEYS[ACTIVE_KEY_ID], signing_input)}"
+
+
+def verify_access_token(token: str, now: float | None = None) -> UserOut | None:
+    """Return the user a signed token was issued to, or None if it is forged, malformed or expired."""
+    parts = token.split(".")
+    if len(parts) != 4 or parts[0] != TOKEN_VERSION:
+        return None
+    version, kid, body, signature = parts
+    key = SIGNING_KEYS.get(kid)
+    if key is None:
+        return None
+    # bytes on both sides: compare_digest rejects str arguments with non-ASCII characters
+    if not hmac.compare_digest(_sign(key, f"{version}.{kid}.{body}").encode(), signature.encode()):
+        return None
+    try:
+        payload = json.loads(_b64decode(body))
+        if payload["exp"] < (time.time() if now is None else now):
+            return None
+        return UserOut(id=payload["sub"], username=payload["username"], full_name=payload["full_name"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
 
 async def authenticate_user_and_get_token(username: str, password: str) -> str | None:
-    async with AsyncSessionLocal() as db:
-        user = await get_user_by_username(db, username)
-        if user is not None:
-            stored_hash = cast(str, user.hashed_password)
-            if stored_hash == fake_hash_password(password):
-                return f"token-{username}"
+    user = await get_cached_user(username)
+    if user is not None:
+        stored_hash = cast(str, user.hashed_password)
+        if stored_hash == fake_hash_password(password):
+            return issue_access_token(UserOut.model_validate(user))
 
     if username == "alice" and password == "secret":
-        return f"token-{username}"
+        return issue_access_token(UserOut(id=0, username="alice", full_name="Alice Dev"))
     return None
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserOut:
-    if not token or not token.startswith("token-"):
+    if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
+    if not (ALLOW_LEGACY_TOKENS and token.startswith("token-")):
+        # signed tokens are self-contained: no database round trip
+        signed_user = verify_access_token(token)
+        if signed_user is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
+        return signed_user
+    # deprecated opaque "token-<username>" tokens, resolved against the database
     username = token.split("-", 1)[1]
-    async with AsyncSessionLocal() as db:
-        user = await get_user_by_username(db, username)
-        if not user:
-            if username == "alice":
-                return UserOut(id=0, username="alice", full_name="Alice Dev")
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-        return UserOut.model_validate(user)
+    user = await get_cached_user(username)
+    if not user:
+        if username == "alice":
+            return UserOut(id=0, username="alice", full_name="Alice Dev")
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return UserOut.model_validate(user)
@@ -0,0 +1,89 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+class GroupCommitter:
+    """Run concurrently submitted writes in one transaction, paying for one commit per batch.
+
+    A batch is flushed ``window`` seconds after its first submission, or as soon
+    as it holds ``max_items`` writes. Every write runs in its own SAVEPOINT, so a
+    failing row only fails its own caller; the others still commit together.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        write: Callable[[AsyncSession, Any], Awaitable[Any]],
+        window: float,
+        max_items: int,
+    ):
+        self.session_factory = session_factory
+        self.write = write
+        self.window = window
+        self.max_items = max_items
+        self._pending: list[tuple[Any, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, payload: Any) -> Any:
+        """Queue one write and wait for the result of ``write(db, payload)`` once its batch has committed."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((payload, future))
+        if len(self._pending) >= self.max_items:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._start_flush)
+        return await future
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list[tuple[Any, asyncio.Future]]) -> None:
+        results: list[tuple[asyncio.Future, Any]] = []
+        try:
+            async with self.session_factory() as db:
+                for payload, future in batch:
+                    if future.cancelled():
+                        continue
+                    try:
+                        async with db.begin_nested():
+                            results.append((future, await self.write(db, payload)))
+                    except Exception as exc:
+                        future.set_exception(exc)
+                await db.commit()
+        except BaseException as exc:
+            # the transaction failed or was cancelled: nothing in this batch was written
+            for _, future in batch:
+                if future.done():
+                    continue
+                if isinstance(exc, Exception):
+                    future.set_exception(exc)
+                else:
+                    future.cancel()
+            if not isinstance(exc, Exception):
+                raise
+            return
+        self.batches += 1
+        self.items += len(results)
+        for future, result in results:
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
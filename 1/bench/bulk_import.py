@@ -0,0 +1,87 @@
+"""Rows per second through POST /items/bulk.
+
+Sends NDJSON and JSON-array bodies of ``--rows`` items in pieces of 64 KiB,
+for each BULK_INSERT_CHUNK_SIZE given, and reports end-to-end throughput
+(parsing, validation, inserts with their triggers, commits). The "sqlite"
+rows insert the same rows with sqlite3 executemany, in transactions of the
+same size and under the same pragmas: that is what the database alone
+sustains with the FTS, counter and change log triggers, and bounds what the
+endpoint can reach. Every run adds its rows to the same table, and FTS
+upkeep grows with the index, so compare rows next to each other.
+
+    python bench/bulk_import.py --rows 200000 --chunk-sizes 500 1000 5000
+"""
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+import time
+
+import common
+
+PIECE = 64 * 1024
+
+
+def _pieces(body: bytes):
+    async def stream():
+        for start in range(0, len(body), PIECE):
+            yield body[start : start + PIECE]
+
+    return stream()
+
+
+async def main(args) -> None:
+    path = common.configure(**({"SQLITE_PROFILE": args.profile} if args.profile else {}))
+    import database
+    import main as app_main
+
+    rng = random.Random(3)
+    rows = [{"title": common.random_title(rng), "description": common.random_title(rng, 8)} for _ in range(args.rows)]
+    bodies = {
+        "ndjson": ("application/x-ndjson", "".join(json.dumps(row) + "\n" for row in rows).encode()),
+        "array": ("application/json", json.dumps(rows).encode()),
+    }
+    results = []
+    async with common.running_app() as client:
+        await client.post("/users/", json={"username": "bench0", "password": "secret1"})
+        token = (await client.post("/token", data={"username": "bench0", "password": "secret1"})).json()
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+        for chunk_size in args.chunk_sizes:
+            app_main.BULK_INSERT_CHUNK_SIZE = chunk_size
+            elapsed = _sqlite_import(path, database.SQLITE_PROFILES[database.SQLITE_PROFILE], rows, chunk_size)
+            results.append({"body": "sqlite", "chunk": chunk_size, "seconds": elapsed, "rows_per_s": args.rows / elapsed})
+            for name, (content_type, body) in bodies.items():
+                started = time.perf_counter()
+                response = await client.post(
+                    "/items/bulk", content=_pieces(body), headers={**headers, "Content-Type": content_type}
+                )
+                elapsed = time.perf_counter() - started
+                result = response.json()
+                assert result["created"] == args.rows, result
+                results.append({"body": name, "chunk": chunk_size, "seconds": elapsed, "rows_per_s": args.rows / elapsed})
+    common.print_table(results)
+
+
+def _sqlite_import(path: str, pragmas: dict, rows: list[dict], chunk_size: int) -> float:
+    raw = sqlite3.connect(path, isolation_level=None)
+    for pragma, value in pragmas.items():
+        raw.execute(f"PRAGMA {pragma}={value}")
+    owner_id = raw.execute("SELECT id FROM users WHERE username = 'bench0'").fetchone()[0]
+    params = [(row["title"], row["description"], owner_id) for row in rows]
+    started = time.perf_counter()
+    for start in range(0, len(params), chunk_size):
+        raw.execute("BEGIN")
+        raw.executemany("INSERT INTO items (title, description, owner_id) VALUES (?, ?, ?)", params[start : start + chunk_size])
+        raw.execute("COMMIT")
+    elapsed = time.perf_counter() - started
+    raw.close()
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[1000])
+    parser.add_argument("--profile", help="SQLITE_PROFILE to run under (default: the app's default)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,151 @@
+"""Shared setup for the benchmark scripts in this directory.
+
+Every script runs the app in-process against a fresh database in a temporary
+directory. The app modules read their configuration at import time, so a
+script calls ``configure`` before importing any of them.
+
+Run a script from the directory above this one, e.g. ``python bench/list_totals.py``;
+each accepts ``--help``. Absolute numbers depend on the machine: compare rows
+of one run, not runs on different machines.
+"""
+import atexit
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = [
+    "alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel",
+    "india", "juliet", "kilo", "lima", "mike", "november", "oscar", "papa",
+    "quebec", "romeo", "sierra", "tango", "uniform", "victor", "whiskey", "xray",
+]  # fmt: skip
+
+
+def configure(**env: str) -> str:
+    """Point the app at a new database file, removed at exit, apply ``env`` and return the file's path."""
+    directory = tempfile.mkdtemp(prefix="items-bench-")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    path = os.path.join(directory, "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    os.environ.setdefault("AUTH_SIGNING_KEYS", "bench:bench-signing-key")
+    os.environ.setdefault("CHANGE_LOG_COMPACT_INTERVAL_SECONDS", "0")
+    os.environ.update(env)
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    # the access log would otherwise print a line per request
+    import logging
+
+    logging.getLogger("assignments.access").disabled = True
+    return path
+
+
+@asynccontextmanager
+async def running_app():
+    """Start the app (lifespan included) and yield an httpx client talking to it in-process."""
+    import httpx
+
+    import database
+    import main
+
+    try:
+        async with main.app.router.lifespan_context(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                yield client
+    finally:
+        # pooled aiosqlite connections each keep a thread that would block interpreter exit
+        for engine in (database.writer_engine, database.reader_engine, database.aux_reader_engine, database.export_engine):
+            if engine is not None:
+                await engine.dispose()
+
+
+def random_title(rng: random.Random, words: int = 3) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed(path: str, items: int, users: int = 10, seed: int = 1) -> None:
+    """Insert ``users`` users ("bench0".."benchN", password "secret") and ``items`` more items.
+
+    Writes straight to the file with sqlite3 after the app created its schema,
+    so the FTS, counter and change log triggers all run.
+    """
+    import crud
+
+    rng = random.Random(seed)
+    raw = sqlite3.connect(path)
+    # the journal mode is left to the app's SQLITE_PROFILE, which it persists in the file
+    raw.execute("PRAGMA synchronous=OFF")
+    # OR IGNORE: seeding again adds items for the same users
+    raw.executemany(
+        "INSERT OR IGNORE INTO users (username, full_name, hashed_password) VALUES (?, ?, ?)",
+        [(f"bench{n}", f"Bench {n}", crud.fake_hash_password("secret")) for n in range(users)],
+    )
+    raw.commit()
+    user_ids = [row[0] for row in raw.execute("SELECT id FROM users ORDER BY id")]
+    batch = 10_000
+    for start in range(0, items, batch):
+        raw.executemany(
+            "INSERT INTO items (title, description, owner_id) VALUES (?, ?, ?)",
+            [
+                (random_title(rng), random_title(rng, 8), rng.choice(user_ids))
+                for _ in range(min(batch, items - start))
+            ],
+        )
+        raw.commit()
+    raw.close()
+
+
+def token_headers(username: str = "bench0", user_id: int = 1) -> dict[str, str]:
+    """Authorization header for a seeded user, signed without a /token round trip."""
+    import auth
+    from schemas import UserOut
+
+    token = auth.issue_access_token(UserOut(id=user_id, username=username, full_name=None))
+    return {"Authorization": f"Bearer {token}"}
+
+
+def summarize(samples_ns: list[int]) -> dict[str, float]:
+    """p50, p99 and mean of per-operation durations, in milliseconds."""
+    ordered = sorted(samples_ns)
+    return {
+        "p50_ms": ordered[len(ordered) // 2] / 1e6,
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] / 1e6,
+        "mean_ms": statistics.fmean(ordered) / 1e6,
+    }
+
+
+def print_table(rows: list[dict]) -> None:
+    """Print dicts sharing the same keys as an aligned text table."""
+    if not rows:
+        return
+    columns = list(rows[0])
+    cells = [[_cell(row[col]) for col in columns] for row in rows]
+    widths = [max(len(col), *(len(line[i]) for line in cells)) for i, col in enumerate(columns)]
+    print("  ".join(col.ljust(width) for col, width in zip(columns, widths)))
+    for line in cells:
+        print("  ".join(cell.ljust(width) for cell, width in zip(line, widths)))
+
+
+def _cell(value) -> str:
+    return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+
+class Timer:
+    """Collects the duration of each ``with timer:`` block in nanoseconds; not for overlapping blocks."""
+
+    def __init__(self):
+        self.samples: list[int] = []
+
+    def __enter__(self):
+        self._started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter_ns() - self._started)
@@ -0,0 +1,101 @@
+"""Hit ratio and throughput of the item fragment cache under a Zipfian read workload on GET /items/{id}.
+
+Item ids are ranked in a random order and the k-th most popular is read
+with probability proportional to 1 / k**s. For each ``--max-bytes``
+budget the script installs an empty crud.item_fragments of that size,
+warms it with ``--warmup`` reads, and then reports the hit ratio, the
+evictions, req/s and the mean "serialize" segment of the Server-Timing
+header over ``--requests`` more. A budget of 0 caches nothing.
+best_hit_ratio is the share of measured reads whose id was read before,
+the most an unbounded cache could hit.
+
+    python bench/fragment_cache.py --items 100000 --s 0.8 1.1 --max-bytes 0 1048576 4194304 16777216
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import time
+
+import common
+
+
+def zipf_ids(ids: list[int], s: float, count: int, rng: random.Random) -> list[int]:
+    """``count`` ids drawn from ``ids`` with Zipf exponent ``s`` over a random popularity order."""
+    ranked = list(ids)
+    rng.shuffle(ranked)
+    cum_weights = list(itertools.accumulate(1 / rank**s for rank in range(1, len(ranked) + 1)))
+    return rng.choices(ranked, cum_weights=cum_weights, k=count)
+
+
+def _serialize_ms(server_timing: str) -> float:
+    # the "serialize;dur=..." segment of the app's Server-Timing header
+    for segment in server_timing.split(","):
+        name, _, duration = segment.strip().partition(";dur=")
+        if name == "serialize":
+            return float(duration)
+    return 0.0
+
+
+async def _client_loop(client, ids: list[int], samples: list[int], serialize_ms: list[float]) -> None:
+    for item_id in ids:
+        started = time.perf_counter_ns()
+        response = await client.get(f"/items/{item_id}")
+        samples.append(time.perf_counter_ns() - started)
+        response.raise_for_status()
+        serialize_ms.append(_serialize_ms(response.headers["Server-Timing"]))
+
+
+async def _run(client, ids: list[int], clients: int, samples: list[int], serialize_ms: list[float]) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(_client_loop(client, ids[n::clients], samples, serialize_ms) for n in range(clients)))
+    return time.perf_counter() - started
+
+
+async def main(args) -> None:
+    path = common.configure()
+    import crud
+    from cache import FragmentCache
+
+    rows = []
+    async with common.running_app() as client:
+        common.seed(path, args.items)
+        ids = list(range(1, args.items + 1))
+        for s in args.s:
+            workload = zipf_ids(ids, s, args.warmup + args.requests, random.Random(6))
+            # a read can only hit if its id was read before; the rest miss however large the cache
+            seen: set[int] = set()
+            repeats = 0
+            for n, item_id in enumerate(workload):
+                repeats += n >= args.warmup and item_id in seen
+                seen.add(item_id)
+            for max_bytes in args.max_bytes:
+                crud.item_fragments = FragmentCache(max_bytes)
+                await _run(client, workload[: args.warmup], args.concurrency, [], [])
+                before = crud.item_fragments.stats()
+                samples: list[int] = []
+                serialize_ms: list[float] = []
+                elapsed = await _run(client, workload[args.warmup :], args.concurrency, samples, serialize_ms)
+                after = crud.item_fragments.stats()
+                hits, misses = after["hits"] - before["hits"], after["misses"] - before["misses"]
+                rows.append(
+                    {"s": s, "max_kib": max_bytes // 1024, "entries": after["entries"],
+                     "hit_ratio": hits / (hits + misses), "best_hit_ratio": repeats / args.requests,
+                     "evictions": after["evictions"] - before["evictions"], "req_per_s": len(samples) / elapsed,
+                     **common.summarize(samples), "serialize_us": statistics.fmean(serialize_ms) * 1e3}
+                )  # fmt: skip
+    common.print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--s", type=float, nargs="+", default=[0.8, 1.1], help="Zipf exponents")
+    parser.add_argument(
+        "--max-bytes", type=int, nargs="+", default=[0, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024, 16 * 1024 * 1024]
+    )
+    parser.add_argument("--warmup", type=int, default=5000, help="reads before measuring, per budget")
+    parser.add_argument("--requests", type=int, default=10_000, help="measured reads per budget")
+    parser.add_argument("--concurrency", type=int, default=8)
+    asyncio.run(main(parser.parse_args()))
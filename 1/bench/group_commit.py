@@ -0,0 +1,67 @@
+"""Latency and throughput of POST /items/ with and without group commit.
+
+Runs ``--clients`` concurrent clients creating items, first on the direct
+path (one transaction and commit per item), then with a GroupCommitter for
+each window in ``--windows-ms``. Commit cost depends on the SQLITE_PROFILE:
+"durable" fsyncs every commit, which is where batching pays off most;
+"production" (synchronous=NORMAL) only fsyncs at checkpoints.
+
+    python bench/group_commit.py --profile durable --clients 1 16 64
+"""
+import argparse
+import asyncio
+import time
+
+import common
+
+
+async def _client_loop(client, headers: dict, requests: int, samples: list[int]) -> None:
+    for n in range(requests):
+        started = time.perf_counter_ns()
+        response = await client.post("/items/", json={"title": f"grouped {n}"}, headers=headers)
+        samples.append(time.perf_counter_ns() - started)
+        response.raise_for_status()
+
+
+async def main(args) -> None:
+    path = common.configure(SQLITE_PROFILE=args.profile)
+    import crud
+    import database
+    from batching import GroupCommitter
+
+    rows = []
+    async with common.running_app() as client:
+        common.seed(path, 0, users=max(args.clients))
+        users = [common.token_headers(f"bench{n}", n + 1) for n in range(max(args.clients))]
+        for window_ms in [0.0, *args.windows_ms]:
+            crud.item_group_committer = None
+            if window_ms:
+                crud.item_group_committer = GroupCommitter(
+                    database.AsyncSessionLocal, crud._insert_item, window=window_ms / 1000, max_items=args.max_items
+                )
+            for clients in args.clients:
+                samples: list[int] = []
+                per_client = max(1, args.requests // clients)
+                started = time.perf_counter()
+                await asyncio.gather(*(_client_loop(client, users[n], per_client, samples) for n in range(clients)))
+                elapsed = time.perf_counter() - started
+                committer = crud.item_group_committer
+                rows.append(
+                    {"mode": f"group {window_ms:g} ms" if window_ms else "direct", "clients": clients,
+                     **common.summarize(samples), "items_per_s": len(samples) / elapsed,
+                     "avg_batch": committer.stats()["avg_batch_size"] if committer else 1.0}
+                )  # fmt: skip
+                if committer:
+                    committer.batches = committer.items = 0
+    print(f"SQLITE_PROFILE={args.profile}")
+    common.print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", default="durable", help="SQLITE_PROFILE to run under")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--windows-ms", type=float, nargs="+", default=[2, 5])
+    parser.add_argument("--max-items", type=int, default=64, help="GROUP_COMMIT_MAX_ITEMS")
+    parser.add_argument("--requests", type=int, default=2000, help="items created per row")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,61 @@
+"""Wall-clock latency of list pages that include a total.
+
+Compares computing the total and the page one after the other on the
+request's connection with computing them at the same time on two
+connections (the auxiliary read pool), for plain and search listings,
+at one and several concurrent clients.
+
+    python bench/list_totals.py --rows 1000000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import common
+
+
+async def _client_loop(client, params_for, requests: int, samples: list[int]) -> None:
+    for _ in range(requests):
+        started = time.perf_counter_ns()
+        response = await client.get("/items/", params=params_for())
+        samples.append(time.perf_counter_ns() - started)
+        response.raise_for_status()
+
+
+async def main(args) -> None:
+    path = common.configure()
+    import crud
+    import database
+
+    async with common.running_app() as client:
+        common.seed(path, args.rows)
+        rng = random.Random(2)
+        shapes = {
+            "plain": lambda: {"limit": 20},
+            "search": lambda: {"q": f"{rng.choice(common.WORDS)} {rng.choice(common.WORDS)}", "limit": 20},
+        }
+        rows = []
+        for shape, params_for in shapes.items():
+            for mode in ("sequential", "concurrent"):
+                # without the auxiliary pool get_items runs total and page in turn
+                crud.AuxReadSessionLocal = None if mode == "sequential" else database.AuxReadSessionLocal
+                for clients in args.concurrency:
+                    samples: list[int] = []
+                    started = time.perf_counter()
+                    per_client = max(1, args.requests // clients)
+                    await asyncio.gather(*(_client_loop(client, params_for, per_client, samples) for _ in range(clients)))
+                    elapsed = time.perf_counter() - started
+                    rows.append(
+                        {"query": shape, "total": mode, "clients": clients, **common.summarize(samples),
+                         "req_per_s": len(samples) / elapsed}
+                    )  # fmt: skip
+        common.print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=400, help="requests per configuration")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    asyncio.run(main(parser.parse_args()))
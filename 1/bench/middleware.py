@@ -0,0 +1,101 @@
+"""Throughput of GET /items/{id} with the pure-ASGI timing middleware and with the one it replaced.
+
+"asgi" is the app as shipped: instrumentation.TimingMiddleware, whose access
+log lines go through a queue to a listener thread. "base_http" swaps it for
+the former ``@app.middleware("http")`` function, which ran inside Starlette's
+BaseHTTPMiddleware and printed two lines per request on the event loop. Log
+output of both goes to /dev/null, so only its cost on the request path counts.
+
+    python bench/middleware.py --requests 5000 --concurrency 1 8
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import sys
+import time
+
+import common
+
+
+async def timing_middleware(request, call_next):
+    # as in main.py before the pure-ASGI middleware
+    start = time.time()
+    print(f"Incoming request: {request.method} {request.url}")
+    response = await call_next(request)
+    process_time = time.time() - start
+    response.headers["X-Process-Time"] = str(process_time)
+    response.headers["X-Custom-Header"] = "AssignmentsApp"
+    print(f"Completed in {process_time:.4f}s -> status {response.status_code}")
+    return response
+
+
+def _use_middleware(app, name: str) -> None:
+    from starlette.middleware import Middleware
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    from instrumentation import TimingMiddleware
+
+    if not hasattr(app, "_bench_asgi_middleware"):
+        app._bench_asgi_middleware = list(app.user_middleware)
+    stack = list(app._bench_asgi_middleware)
+    if name == "base_http":
+        replacement = Middleware(BaseHTTPMiddleware, dispatch=timing_middleware)
+        stack = [replacement if m.cls is TimingMiddleware else m for m in stack]
+    app.user_middleware = stack
+    # rebuilt from user_middleware on the next request
+    app.middleware_stack = None
+
+
+async def _client_loop(client, ids: list[int], requests: int, rng: random.Random, samples: list[int]) -> None:
+    for _ in range(requests):
+        started = time.perf_counter_ns()
+        response = await client.get(f"/items/{rng.choice(ids)}")
+        samples.append(time.perf_counter_ns() - started)
+        response.raise_for_status()
+
+
+async def main(args) -> None:
+    path = common.configure()
+    import logging
+
+    import main as app_main
+
+    # measure the access log's cost on the request path, with the lines themselves discarded
+    logging.getLogger("assignments.access").disabled = False
+    rows = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        real_stderr, sys.stderr = sys.stderr, devnull
+        try:
+            async with common.running_app() as client:
+                common.seed(path, args.items)
+                ids = list(range(1, args.items + 1))
+                rng = random.Random(4)
+                for _ in range(args.rounds):
+                    for name in ("base_http", "asgi"):
+                        _use_middleware(app_main.app, name)
+                        await _client_loop(client, ids, 100, rng, [])  # warm up
+                        for clients in args.concurrency:
+                            samples: list[int] = []
+                            per_client = max(1, args.requests // clients)
+                            started = time.perf_counter()
+                            loops = [_client_loop(client, ids, per_client, rng, samples) for _ in range(clients)]
+                            await asyncio.gather(*loops)
+                            elapsed = time.perf_counter() - started
+                            rows.append(
+                                {"middleware": name, "clients": clients, **common.summarize(samples),
+                                 "req_per_s": len(samples) / elapsed}
+                            )  # fmt: skip
+        finally:
+            sys.stderr = real_stderr
+    common.print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=3000, help="requests per configuration")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--rounds", type=int, default=2, help="alternate the two middlewares this many times")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,131 @@
+"""Read and write throughput under each SQLITE_PROFILE (database.SQLITE_PROFILES).
+
+The profile is read at import time, so every profile runs in its own
+subprocess against its own database of ``--items`` rows. Each runs three
+phases of ``--seconds`` seconds:
+
+- read: ``--readers`` clients alternating GET /items/{id} and a list page;
+- write: ``--writers`` clients creating and updating items;
+- mixed: both at once, where the rollback journal of "default" makes
+  readers and the writer wait for each other and WAL does not;
+- sqlite: the database alone, with sqlite3 and the profile's pragmas: one-row
+  write transactions, then point reads. Through the app, request handling
+  takes most of the time and hides part of the difference between profiles.
+
+Requests that fail (e.g. "database is locked") are counted, not retried.
+
+    python bench/profiles.py --items 100000 --seconds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+
+import common
+
+
+async def _reader(client, items: int, until: float, rng: random.Random, counts: dict) -> None:
+    while time.perf_counter() < until:
+        if rng.random() < 0.5:
+            response = await client.get(f"/items/{rng.randrange(1, items + 1)}")
+        else:
+            response = await client.get("/items/", params={"limit": 20, "offset": rng.randrange(items - 20)})
+        counts["reads" if response.status_code == 200 else "errors"] += 1
+
+
+async def _writer(client, headers: dict, until: float, counts: dict) -> None:
+    while time.perf_counter() < until:
+        response = await client.post("/items/", json={"title": "profiled"}, headers=headers)
+        counts["writes" if response.status_code == 200 else "errors"] += 1
+        if response.status_code == 200:
+            response = await client.put(f"/items/{response.json()['id']}", json={"title": "reprofiled"}, headers=headers)
+            counts["writes" if response.status_code == 200 else "errors"] += 1
+
+
+def _sqlite_phases(path: str, pragmas: dict, items: int, seconds: float) -> dict[str, float]:
+    # the database alone: one-row write transactions, then point reads
+    raw = sqlite3.connect(path, isolation_level=None)
+    for pragma, value in pragmas.items():
+        raw.execute(f"PRAGMA {pragma}={value}")
+    rng = random.Random(6)
+    writes = reads = 0
+    until = time.perf_counter() + seconds
+    while time.perf_counter() < until:
+        raw.execute("BEGIN")
+        raw.execute("INSERT INTO items (title, owner_id) VALUES ('raw', 1)")
+        raw.execute("COMMIT")
+        writes += 1
+    until = time.perf_counter() + seconds
+    while time.perf_counter() < until:
+        raw.execute("SELECT * FROM items WHERE id = ?", (rng.randrange(1, items + 1),)).fetchall()
+        reads += 1
+    raw.close()
+    return {"sqlite_reads_per_s": reads / seconds, "sqlite_writes_per_s": writes / seconds, "sqlite_errors": 0}
+
+
+async def worker(args) -> None:
+    path = common.configure(SQLITE_PROFILE=args.worker)
+    import database
+
+    result = {"profile": args.worker}
+    async with common.running_app() as client:
+        common.seed(path, args.items, users=args.writers)
+        async with database.reader_engine.connect() as conn:
+            result["journal_mode"] = (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar_one()
+        writers = [common.token_headers(f"bench{n}", n + 1) for n in range(args.writers)]
+        rng = random.Random(5)
+        for phase in ("read", "write", "mixed"):
+            counts = {"reads": 0, "writes": 0, "errors": 0}
+            until = time.perf_counter() + args.seconds
+            tasks = []
+            if phase != "write":
+                tasks += [_reader(client, args.items, until, rng, counts) for _ in range(args.readers)]
+            if phase != "read":
+                tasks += [_writer(client, headers, until, counts) for headers in writers]
+            await asyncio.gather(*tasks)
+            result[f"{phase}_reads_per_s"] = counts["reads"] / args.seconds
+            result[f"{phase}_writes_per_s"] = counts["writes"] / args.seconds
+            result[f"{phase}_errors"] = counts["errors"]
+    result.update(_sqlite_phases(path, database.SQLITE_PROFILES[args.worker], args.items, args.seconds))
+    print(json.dumps(result))
+
+
+def main(args) -> None:
+    # only for the profile names; each worker configures its own database
+    common.configure()
+    import database
+
+    rows = []
+    for profile in args.profiles or list(database.SQLITE_PROFILES):
+        command = [sys.executable, os.path.abspath(__file__), "--worker", profile]
+        for option in ("items", "seconds", "readers", "writers"):
+            command += [f"--{option}", str(getattr(args, option))]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.splitlines()[-1])
+        for phase in ("read", "write", "mixed", "sqlite"):
+            rows.append(
+                {"profile": profile, "journal": result["journal_mode"], "phase": phase,
+                 "reads_per_s": result[f"{phase}_reads_per_s"], "writes_per_s": result[f"{phase}_writes_per_s"],
+                 "errors": result[f"{phase}_errors"]}
+            )  # fmt: skip
+    common.print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", help="profiles to run (default: all)")
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--seconds", type=float, default=5, help="length of each phase")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        asyncio.run(worker(args))
+    else:
+        main(args)
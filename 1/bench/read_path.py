@@ -0,0 +1,81 @@
+"""CPU and memory per row of a 100-item page on the Core and ORM read paths (crud.ITEM_READ_PATH).
+
+"get_items" measures crud.get_items alone: the query, building the rows and
+loading their owners. "endpoint" measures GET /items/ end to end, response
+body included. CPU is process time per page, so it covers the aiosqlite
+thread too; memory is the tracemalloc peak while one page is produced.
+
+    python bench/read_path.py --items 10000 --pages 300
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import tracemalloc
+
+import common
+
+
+async def _measure(fetch, offsets: list[int], limit: int) -> dict[str, float]:
+    for offset in offsets[:20]:  # warm up
+        await fetch(offset)
+    started = time.process_time()
+    for offset in offsets:
+        await fetch(offset)
+    cpu_per_page = (time.process_time() - started) / len(offsets)
+    # tracing slows everything down, so memory is measured on its own
+    tracemalloc.start()
+    peaks = []
+    for offset in offsets[:20]:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        await fetch(offset)
+        # only what the page allocated on top of what was already held
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    peak = statistics.median(peaks)
+    return {
+        "cpu_ms_per_page": cpu_per_page * 1e3,
+        "cpu_us_per_row": cpu_per_page / limit * 1e6,
+        "peak_kib_per_page": peak / 1024,
+        "peak_bytes_per_row": peak / limit,
+    }
+
+
+async def main(args) -> None:
+    path = common.configure()
+    import crud
+    import database
+
+    rows = []
+    async with common.running_app() as client:
+        common.seed(path, args.items)
+        rng = random.Random(5)
+        offsets = [rng.randrange(args.items - args.limit) for _ in range(args.pages)]
+
+        async def get_items(offset: int) -> None:
+            async with database.ReadSessionLocal() as db:
+                await crud.get_items(db, limit=args.limit, offset=offset, include_total=False)
+
+        async def endpoint(offset: int) -> None:
+            response = await client.get("/items/", params={"limit": args.limit, "offset": offset})
+            response.raise_for_status()
+
+        for _ in range(args.rounds):
+            for read_path in ("orm", "core"):
+                crud.ITEM_READ_PATH = read_path
+                for measured, fetch in (("get_items", get_items), ("endpoint", endpoint)):
+                    rows.append(
+                        {"read_path": read_path, "measured": measured, **await _measure(fetch, offsets, args.limit)}
+                    )
+    common.print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=300, help="pages per measurement")
+    parser.add_argument("--rounds", type=int, default=2, help="alternate the two read paths this many times")
+    asyncio.run(main(parser.parse_args()))
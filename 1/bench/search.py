@@ -0,0 +1,76 @@
+"""LIKE substring search against the FTS5 index, at growing table sizes.
+
+For each size in ``--rows`` the table is filled up to that many items and
+each search term is timed three ways:
+
+- like: the former query, ``title LIKE '%q%' OR description LIKE '%q%'``
+  for a page of 20 plus an exact count(*), run with sqlite3;
+- fts: a MATCH on items_fts for the same page, in items_fts rowid order as
+  crud does, plus an exact count(*);
+- endpoint: GET /items/?q=... through the app, which estimates the total.
+
+"alpha" is in about a third of the rows, "zulu" in none (the worst case for
+LIKE, which reads every row to find that out).
+
+    python bench/search.py --rows 100000 1000000
+"""
+import argparse
+import asyncio
+import sqlite3
+import time
+
+import common
+
+LIKE_PAGE = (
+    "SELECT id, title, description, owner_id FROM items"
+    " WHERE title LIKE ? OR description LIKE ? ORDER BY id LIMIT 20"
+)
+LIKE_COUNT = "SELECT count(*) FROM items WHERE title LIKE ? OR description LIKE ?"
+FTS_PAGE = (
+    "SELECT items.id, items.title, items.description, items.owner_id FROM items"
+    " JOIN items_fts ON items_fts.rowid = items.id WHERE items_fts MATCH ? ORDER BY items_fts.rowid LIMIT 20"
+)
+FTS_COUNT = "SELECT count(*) FROM items_fts WHERE items_fts MATCH ?"
+
+
+def _time_sql(raw: sqlite3.Connection, statements: list[tuple[str, tuple]], repeat: int) -> list[int]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for statement, params in statements:
+            raw.execute(statement, params).fetchall()
+        samples.append(time.perf_counter_ns() - started)
+    return samples
+
+
+async def main(args) -> None:
+    path = common.configure()
+    rows = []
+    async with common.running_app() as client:
+        seeded = 0
+        for size in sorted(args.rows):
+            common.seed(path, size - seeded, seed=size)
+            seeded = size
+            raw = sqlite3.connect(path)
+            for term in args.terms:
+                pattern = f"%{term}%"
+                like = _time_sql(raw, [(LIKE_PAGE, (pattern, pattern)), (LIKE_COUNT, (pattern, pattern))], args.repeat)
+                fts = _time_sql(raw, [(FTS_PAGE, (term,)), (FTS_COUNT, (term,))], args.repeat)
+                endpoint = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter_ns()
+                    response = await client.get("/items/", params={"q": term, "limit": 20})
+                    endpoint.append(time.perf_counter_ns() - started)
+                    response.raise_for_status()
+                for name, samples in (("like", like), ("fts", fts), ("endpoint", endpoint)):
+                    rows.append({"rows": size, "term": term, "search": name, **common.summarize(samples)})
+            raw.close()
+    common.print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--terms", nargs="+", default=["alpha", "zulu"])
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,116 @@
+"""CPU per 100-item page of GET /items/ response serialization, old and current, on the same rows.
+
+Each page is read once per read path, then serialized repeatedly by:
+
+- "double_validation": the former handler. It built ItemOut.model_validate
+  per row wrapped in ItemList, and FastAPI then validated that again against
+  the route's response_model and rendered it through TimedJSONResponse.
+- "single_pass": one ItemOut per row (main._item_model) in an unvalidated
+  ItemList, dumped with the model's own serializer: the raw-bytes path
+  before the fragment cache.
+- "fragments_cold" / "fragments_warm": the shipped path, which joins
+  per-item fragments from crud.item_fragments: with the cache cleared before
+  every page, and with every fragment already cached.
+
+``--profile FILE`` also writes cProfile stats of one pass per variant to
+FILE.<read_path>.<variant>, for ``python -m pstats``.
+
+    python bench/serialize.py --pages 50 --repeat 20 --profile /tmp/serialize.prof
+"""
+import argparse
+import asyncio
+import cProfile
+import time
+
+import common
+
+# room for every page's fragments, so the warm variant never misses
+CACHE_BYTES = 256 * 1024 * 1024
+
+
+async def main(args) -> None:
+    path = common.configure()
+    import pydantic_core
+    from fastapi.routing import serialize_response
+
+    import crud
+    import database
+    import main as app_main
+    import schemas
+    from cache import FragmentCache
+
+    route = next(r for r in app_main.app.routes if getattr(r, "path", None) == "/items/" and "GET" in r.methods)
+    envelope = {"total": args.items, "total_is_estimate": False, "limit": args.limit, "offset": 0, "next_cursor": None}
+
+    async def double_validation(items) -> bytes:
+        page = schemas.ItemList(items=[schemas.ItemOut.model_validate(item) for item in items], **envelope)
+        content = await serialize_response(field=route.response_field, response_content=page)
+        return app_main.TimedJSONResponse(content).body
+
+    async def single_pass(items) -> bytes:
+        page = schemas.ItemList.model_construct(items=[app_main._item_model(item) for item in items], **envelope)
+        return page.__pydantic_serializer__.to_json(page)
+
+    async def fragments(items) -> bytes:
+        rest = pydantic_core.to_json(envelope)
+        return b'{"items":[' + b",".join(app_main._item_fragment(item) for item in items) + b"]," + rest[1:]
+
+    async def fragments_cold(items) -> bytes:
+        crud.item_fragments = FragmentCache(CACHE_BYTES)
+        return await fragments(items)
+
+    variants = {
+        "double_validation": double_validation,
+        "single_pass": single_pass,
+        "fragments_cold": fragments_cold,
+        "fragments_warm": fragments,
+    }
+
+    rows = []
+    async with common.running_app():
+        common.seed(path, args.items)
+        for read_path in ("core", "orm"):
+            pages = []
+            async with database.ReadSessionLocal() as db:
+                for n in range(args.pages):
+                    items, *_ = await crud.get_items(
+                        db, limit=args.limit, offset=n * args.limit, include_total=False, read_path=read_path
+                    )
+                    pages.append(items)
+            bodies = {name: await serialize(pages[0]) for name, serialize in variants.items()}
+            assert len(set(bodies.values())) == 1, f"variants disagree on the body ({read_path})"
+
+            for name, serialize in variants.items():
+                if name == "fragments_warm":
+                    for items in pages:
+                        await fragments(items)
+                started = time.process_time()
+                for _ in range(args.repeat):
+                    for items in pages:
+                        await serialize(items)
+                per_page = (time.process_time() - started) / (args.repeat * len(pages))
+                if args.profile:
+                    # a separate pass, so profiling overhead stays out of the timings
+                    profiler = cProfile.Profile()
+                    profiler.enable()
+                    for items in pages:
+                        await serialize(items)
+                    profiler.disable()
+                    profiler.dump_stats(f"{args.profile}.{read_path}.{name}")
+                rows.append(
+                    {"read_path": read_path, "variant": name, "cpu_us_per_page": per_page * 1e6,
+                     "cpu_us_per_row": per_page / args.limit * 1e6}
+                )  # fmt: skip
+    common.print_table(rows)
+    if args.profile:
+        print(f"profiles written to {args.profile}.<read_path>.<variant>")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=50, help="distinct pages serialized per variant")
+    parser.add_argument("--repeat", type=int, default=20, help="passes over those pages")
+    parser.add_argument("--profile", metavar="FILE", help="write cProfile stats to FILE.<read_path>.<variant>")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,137 @@
+"""Idle cost and fan-out latency of GET /items/stream with thousands of subscribers.
+
+Starts the app under uvicorn (one worker) in a subprocess, opens
+``--subscribers`` SSE connections to it, and reports the server's memory per
+idle connection. It then creates ``--events`` items one at a time and
+measures, for each, the delay from sending the POST until each subscriber
+has read the event: p50, p99 and the slowest subscriber.
+
+The subscribers are plain asyncio sockets in this process and share the
+machine with the server, so the delays include the client's own scheduling.
+
+    python bench/sse_fanout.py --subscribers 5000 --events 20
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import common
+
+
+def _rss_kib(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+async def _wait_until_up(port: int) -> None:
+    for _ in range(200):
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+        except OSError:
+            await asyncio.sleep(0.05)
+            continue
+        writer.close()
+        return
+    raise RuntimeError("server did not start")
+
+
+class Subscriber:
+    def __init__(self):
+        self.reader: asyncio.StreamReader
+        self.writer: asyncio.StreamWriter
+        self.received: list[float] = []
+
+    async def connect(self, port: int) -> None:
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        self.writer.write(b"GET /items/stream HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n")
+        buffered = b""
+        while b": connected" not in buffered:
+            data = await self.reader.read(65536)
+            if not data:
+                raise RuntimeError("stream closed before it started")
+            buffered += data
+
+    async def listen(self) -> None:
+        while data := await self.reader.read(65536):
+            now = time.perf_counter()
+            self.received.extend([now] * data.count(b"event: change"))
+
+
+async def main(args) -> None:
+    common.configure(CHANGE_STREAM_HEARTBEAT_SECONDS="600")
+    import httpx
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"]
+        + ["--timeout-graceful-shutdown", "1"],
+        cwd=common.APP_DIR,
+        env=os.environ.copy(),
+        # the app's access log would print a line per connection
+        stderr=None if args.server_log else subprocess.DEVNULL,
+    )
+    subscribers = [Subscriber() for _ in range(args.subscribers)]
+    listeners = []
+    try:
+        await _wait_until_up(args.port)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}") as client:
+            await client.post("/users/", json={"username": "bench0", "password": "secret1"})
+            token = (await client.post("/token", data={"username": "bench0", "password": "secret1"})).json()
+            headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+            idle_rss = _rss_kib(server.pid)
+            started = time.perf_counter()
+            # connect in waves: a burst of thousands would overflow the listen backlog
+            for start in range(0, len(subscribers), 500):
+                await asyncio.gather(*(sub.connect(args.port) for sub in subscribers[start : start + 500]))
+            connect_s = time.perf_counter() - started
+            await asyncio.sleep(1)
+            per_subscriber_kib = (_rss_kib(server.pid) - idle_rss) / len(subscribers)
+            listeners = [asyncio.create_task(sub.listen()) for sub in subscribers]
+
+            rows = []
+            for n in range(args.events):
+                sent = time.perf_counter()
+                response = await client.post("/items/", json={"title": f"fanned out {n}"}, headers=headers)
+                response.raise_for_status()
+                while any(len(sub.received) <= n for sub in subscribers):
+                    if time.perf_counter() - sent > args.timeout:
+                        raise RuntimeError(f"event {n} not delivered to every subscriber within {args.timeout}s")
+                    await asyncio.sleep(0.005)
+                delays = sorted(sub.received[n] - sent for sub in subscribers)
+                rows.append(
+                    {
+                        "event": n,
+                        "p50_ms": delays[len(delays) // 2] * 1e3,
+                        "p99_ms": delays[int(len(delays) * 0.99)] * 1e3,
+                        "last_ms": delays[-1] * 1e3,
+                    }
+                )
+            stats = (await client.get("/metrics")).json()["change_stream"]
+    finally:
+        for task in listeners:
+            task.cancel()
+        for sub in subscribers:
+            if hasattr(sub, "writer"):
+                sub.writer.close()
+        server.terminate()
+        await asyncio.to_thread(server.wait)
+
+    print(f"{args.subscribers} subscribers connected in {connect_s:.2f}s, {per_subscriber_kib:.1f} KiB server RSS each")
+    print(f"broker: {stats}")
+    common.print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=30, help="seconds to wait for one event to reach everyone")
+    parser.add_argument("--server-log", action="store_true", help="show the server's log output")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,63 @@
+"""Python-side cost of getting a statement ready to execute, rebuilt per request vs prebuilt.
+
+Before SQLAlchemy runs a statement it needs the statement's cache key to
+find the compiled form in its compiled cache. A statement built per request
+has to be constructed and have its key generated every time; a prebuilt one
+(module-level bound-parameter statement, or crud._list_statement's lru_cache)
+is constructed once and memoizes its key. Both columns time construction
+plus key generation, in microseconds per request; nothing touches the
+database.
+
+    python bench/statements.py --number 2000
+"""
+import argparse
+import timeit
+
+import common
+
+
+def main(args) -> None:
+    common.configure()
+    from sqlalchemy import select
+
+    import crud
+    import models
+
+    build_list = crud._list_statement.__wrapped__
+    shapes = {
+        "user by username": (
+            lambda: select(models.User).where(models.User.username == "bench1"),
+            lambda: crud._USER_BY_USERNAME,
+        ),
+        "item by id": (
+            lambda: crud._item_select("core", "contains_eager").where(models.Item.id == 1),
+            lambda: crud._item_statement("core", "contains_eager"),
+        ),
+    }
+    for search in (False, True):
+        for sort_name, seek in (("id", None), ("title", "value")):
+            if search and seek == "value":
+                continue
+            shape = ("core", "contains_eager", search, sort_name, "asc", seek)
+            label = f"list {'search ' if search else ''}sort={sort_name}{' cursor' if seek else ''}"
+            shapes[label] = (lambda shape=shape: build_list(*shape), lambda shape=shape: crud._list_statement(*shape))
+
+    rows = []
+    for label, (rebuilt, prebuilt) in shapes.items():
+        prebuilt()._generate_cache_key()  # warm: build once and memoize the key
+        per_call = {}
+        for name, make in (("rebuilt", rebuilt), ("prebuilt", prebuilt)):
+            seconds = timeit.timeit(lambda: make()._generate_cache_key(), number=args.number)
+            per_call[name] = seconds / args.number * 1e6
+        rows.append(
+            {"statement": label, "rebuilt_us": per_call["rebuilt"], "prebuilt_us": per_call["prebuilt"],
+             "saved_us": per_call["rebuilt"] - per_call["prebuilt"]}
+        )  # fmt: skip
+    common.print_table(rows)
+    print(f"list statement cache: {crud.statement_cache_stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000, help="calls per measurement")
+    main(parser.parse_args())
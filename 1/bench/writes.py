@@ -0,0 +1,73 @@
+"""Write throughput with many concurrent writers: POST, PUT and DELETE /items.
+
+Each writer is a separate user creating an item, updating it twice and
+deleting it, over and over. All writes share the single writer connection,
+so throughput is bounded by how long each write holds it: one
+INSERT/UPDATE/DELETE ... RETURNING statement plus the commit. The statements
+per write are counted to show that.
+
+    python bench/writes.py --writers 1 8 64 --cycles 200
+"""
+import argparse
+import asyncio
+import time
+
+import common
+
+
+async def _writer(client, headers: dict, cycles: int, samples: dict[str, list[int]]) -> None:
+    for n in range(cycles):
+        started = time.perf_counter_ns()
+        response = await client.post("/items/", json={"title": f"written {n}"}, headers=headers)
+        samples["create"].append(time.perf_counter_ns() - started)
+        item_id = response.json()["id"]
+        for title in ("rewritten", "rewritten again"):
+            started = time.perf_counter_ns()
+            response = await client.put(f"/items/{item_id}", json={"title": title}, headers=headers)
+            samples["update"].append(time.perf_counter_ns() - started)
+            response.raise_for_status()
+        started = time.perf_counter_ns()
+        response = await client.delete(f"/items/{item_id}", headers=headers)
+        samples["delete"].append(time.perf_counter_ns() - started)
+        response.raise_for_status()
+
+
+async def main(args) -> None:
+    path = common.configure()
+    import database
+    from sqlalchemy import event
+
+    statements = 0
+
+    def count(conn, cursor, statement, *_):
+        nonlocal statements
+        # the transaction's explicit BEGIN is not part of the write
+        if not statement.startswith("BEGIN"):
+            statements += 1
+
+    rows = []
+    async with common.running_app() as client:
+        common.seed(path, 0, users=max(args.writers))
+        users = [common.token_headers(f"bench{n}", n + 1) for n in range(max(args.writers))]
+        event.listen(database.writer_engine.sync_engine, "before_cursor_execute", count)
+        for writers in args.writers:
+            samples: dict[str, list[int]] = {"create": [], "update": [], "delete": []}
+            statements = 0
+            per_writer = max(1, args.cycles // writers)
+            started = time.perf_counter()
+            await asyncio.gather(*(_writer(client, users[n], per_writer, samples) for n in range(writers)))
+            elapsed = time.perf_counter() - started
+            writes = sum(len(durations) for durations in samples.values())
+            for op, durations in samples.items():
+                rows.append(
+                    {"writers": writers, "op": op, **common.summarize(durations),
+                     "writes_per_s": writes / elapsed, "statements_per_write": statements / writes}
+                )  # fmt: skip
+    common.print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--cycles", type=int, default=400, help="create/update/update/delete cycles per row")
+    asyncio.run(main(parser.parse_args()))
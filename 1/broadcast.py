@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("assignments.broadcast")
+
+# (seq, encoded event) pairs in seq order, and whether more are waiting
+LoadEvents = Callable[[int], Awaitable[tuple[list[tuple[int, bytes]], bool]]]
+LoadHead = Callable[[], Awaitable[int]]
+
+
+class Subscription:
+    """One subscriber's bounded buffer of (seq, event) pairs."""
+
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue[tuple[int, bytes]] = asyncio.Queue(maxsize)
+        self.dropped = False
+
+    async def get(self) -> tuple[int, bytes] | None:
+        """Next buffered event; None once the subscriber was dropped and its buffer is drained."""
+        if self.dropped and self.queue.empty():
+            return None
+        return await self.queue.get()
+
+
+class ChangeBroker:
+    """Fan change log events out to in-process subscribers.
+
+    Writers only call ``notify``. A single tail task then loads the events
+    after the last published sequence number once, encoded once, and copies
+    them into every subscriber's buffer, so idle subscribers cost nothing but
+    their queue. A subscriber whose buffer is full is dropped rather than
+    slowing the others down; it can resume from the log by sequence number.
+    Without a notification the tail still polls every ``poll_interval``
+    seconds, which picks up writes from other processes.
+    """
+
+    def __init__(self, queue_size: int, poll_interval: float):
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.last_seq = 0
+        self._subscribers: set[Subscription] = set()
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._running = False
+        self.published = 0
+        self.dropped = 0
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def start(self, load: LoadEvents, head: LoadHead, last_seq: int) -> None:
+        self.last_seq = last_seq
+        self._running = True
+        self._task = asyncio.get_running_loop().create_task(self._run(load, head))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        # a cancellation can get lost in an await the loop does not control
+        # (it was seen under concurrent writes), so the loop also checks this flag
+        self._running = False
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._drop_all()
+
+    def subscribe(self) -> Subscription:
+        """Register a subscriber for events after ``last_seq`` as of this call."""
+        subscription = Subscription(self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def _publish(self, seq: int, event: bytes) -> None:
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait((seq, event))
+            except asyncio.QueueFull:
+                self._drop(subscription)
+        self.last_seq = seq
+        self.published += 1
+
+    def _drop(self, subscription: Subscription) -> None:
+        subscription.dropped = True
+        self._subscribers.discard(subscription)
+        self.dropped += 1
+
+    def _drop_all(self) -> None:
+        for subscription in list(self._subscribers):
+            self._drop(subscription)
+
+    async def _run(self, load: LoadEvents, head: LoadHead) -> None:
+        while self._running:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                if not self._subscribers:
+                    # nobody to deliver to: only keep up with the head
+                    self.last_seq = await head()
+                    continue
+                more = True
+                while more:
+                    events, more = await load(self.last_seq)
+                    for seq, event in events:
+                        self._publish(seq, event)
+            except Exception:
+                # e.g. the tail fell behind log compaction: subscribers may have
+                # missed events, so they are dropped and resume from the log
+                logger.exception("change broadcast failed")
+                self._drop_all()
+                try:
+                    self.last_seq = await head()
+                except Exception:
+                    logger.exception("change broadcast failed")
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "subscribers": len(self._subscribers),
+            "last_seq": self.last_seq,
+            "published": self.published,
+            "dropped": self.dropped,
+        }
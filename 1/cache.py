@@ -0,0 +1,181 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire ``ttl`` seconds after being loaded.
+
+    Meant for a single event loop: every mutation happens between awaits, so no
+    lock is needed. Concurrent misses for one key share a single loader call.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        # the load later callers for a key join; invalidation unregisters it
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for ``key``, loading it once for all concurrent callers on a miss.
+
+        The load runs in its own task, so it neither depends on nor is
+        cancelled with the caller that started it. ``None`` results are
+        returned but not cached.
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is not sentinel:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.get_running_loop().create_task(self._load(key, loader))
+            # retrieved here so a failure nobody is left waiting for is not reported as never retrieved
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._inflight[key] = task
+        # shield: one caller being cancelled must not cancel the shared load
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        task = asyncio.current_task()
+        try:
+            value = await loader()
+            # invalidate() unregisters the load, so a result read before the
+            # invalidation is returned to its waiters but never stored
+            if value is not None and self._inflight.get(key) is task:
+                self.set(key, value)
+            return value
+        finally:
+            # a newer load for the key may have been registered meanwhile
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop ``key``; callers after this start a fresh load instead of joining one already running."""
+        self._entries.pop(key, None)
+        self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._inflight.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "coalesced": self.coalesced,
+        }
+
+
+class FragmentCache:
+    """Byte-bounded LRU of pre-serialized JSON fragments, one per item id.
+
+    Each entry remembers the row version it was rendered from, so a lookup
+    with a newer version misses instead of serving a stale body. That relies
+    on (item id, version) never naming two different rows: item ids are
+    AUTOINCREMENT (see models.Item), so a fragment put late for a deleted
+    item can only sit unused until it is evicted. Entries are also indexed
+    by owner id because fragments embed the owner.
+    """
+
+    # rough per-entry bookkeeping cost on top of the fragment bytes
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[int, tuple[int, int, bytes]] = OrderedDict()
+        self._by_owner: dict[int, set[int]] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, item_id: int, version: int) -> bytes | None:
+        entry = self._entries.get(item_id)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(item_id)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, item_id: int, version: int, owner_id: int, fragment: bytes) -> None:
+        size = len(fragment) + self.ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        self._discard(item_id)
+        self._entries[item_id] = (version, owner_id, fragment)
+        self._by_owner.setdefault(owner_id, set()).add(item_id)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def invalidate(self, item_id: int) -> None:
+        if self._discard(item_id):
+            self.invalidations += 1
+
+    def invalidate_owner(self, owner_id: int) -> None:
+        for item_id in list(self._by_owner.get(owner_id, ())):
+            self.invalidate(item_id)
+
+    def _discard(self, item_id: int) -> bool:
+        entry = self._entries.pop(item_id, None)
+        if entry is None:
+            return False
+        _, owner_id, fragment = entry
+        self.bytes -= len(fragment) + self.ENTRY_OVERHEAD
+        owned = self._by_owner[owner_id]
+        owned.discard(item_id)
+        if not owned:
+            del self._by_owner[owner_id]
+        return True
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
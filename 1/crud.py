@@ -1,21 +1,153 @@
-from typing import Any, cast
+import asyncio
+import base64
+import json
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Collection, cast
 
-from sqlalchemy import select, func, desc, asc
+from sqlalchemy import select, insert, update, delete, exists, func, desc, asc, and_, or_, tuple_, bindparam, text, union_all
 from sqlalchemy.exc import NoResultFound
+from sqlalchemy.orm import aliased, contains_eager, joinedload, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 import models, schemas
+from batching import GroupCommitter
+from broadcast import ChangeBroker
+from cache import FragmentCache, TTLCache
+from database import AsyncSessionLocal, AuxReadSessionLocal, ReadSessionLocal
+
+
+# How Item.owner is populated on item read paths: "contains_eager" (reuse an
+# inner join to users), "joined" (joinedload) or "selectin" (one extra IN query
+# per page). Each is a fixed number of statements however many rows come back.
+OWNER_LOADING = os.environ.get("ITEM_OWNER_LOADING", "contains_eager")
+
+
+def _with_owner(query, strategy: str | None = None):
+    strategy = strategy or OWNER_LOADING
+    if strategy == "contains_eager":
+        return query.join(models.Item.owner).options(contains_eager(models.Item.owner))
+    if strategy == "joined":
+        return query.options(joinedload(models.Item.owner, innerjoin=True))
+    if strategy == "selectin":
+        return query.options(selectinload(models.Item.owner))
+    raise ValueError(f"unknown owner loading strategy: {strategy}")
+
+
+# "core" reads item and owner columns as plain rows from one join and returns
+# dicts shaped like schemas.ItemOut, skipping ORM instances and the identity
+# map; "orm" returns models.Item instances loaded as per OWNER_LOADING.
+ITEM_READ_PATH = os.environ.get("ITEM_READ_PATH", "core")
+
+_items_table = models.Item.__table__
+_users_table = models.User.__table__
+ITEM_CORE_COLUMNS = (
+    _items_table.c.id,
+    _items_table.c.title,
+    _items_table.c.description,
+    _items_table.c.version,
+    _users_table.c.id.label("owner_id"),
+    _users_table.c.username.label("owner_username"),
+    _users_table.c.full_name.label("owner_full_name"),
+)
+
+
+def _item_select(read_path: str, strategy: str):
+    if read_path == "core":
+        return select(*ITEM_CORE_COLUMNS).select_from(
+            _items_table.join(_users_table, _users_table.c.id == _items_table.c.owner_id)
+        )
+    if read_path == "orm":
+        return _with_owner(select(models.Item), strategy)
+    raise ValueError(f"unknown item read path: {read_path}")
+
+
+def item_row_to_dict(row) -> dict[str, Any]:
+    return {
+        "id": row.id,
+        "title": row.title,
+        "description": row.description,
+        "version": row.version,
+        "owner": {"id": row.owner_id, "username": row.owner_username, "full_name": row.owner_full_name},
+    }
 
 
 def fake_hash_password(password: str) -> str:
     return "fakehashed" + password
 
 
+# Hot statements are built once at import (or once per shape, below) and only
+# their bound parameters change per call, which skips rebuilding the construct
+# and lets SQLAlchemy reuse its memoized cache key.
+_USER_BY_USERNAME = select(models.User).where(models.User.username == bindparam("username"))
+_COUNT_ITEMS = select(models.Counter.value).where(models.Counter.name == "items")
+_VOCAB_PREFIX_DOCS = select(func.coalesce(func.sum(models.items_fts_vocab.c.doc), 0)).where(
+    models.items_fts_vocab.c.term >= bindparam("prefix_low"),
+    models.items_fts_vocab.c.term < bindparam("prefix_high"),
+)
+
+
 async def get_user_by_username(db: AsyncSession, username: str):
-    q = select(models.User).where(models.User.username == username)
-    result = await db.execute(q)
+    result = await db.execute(_USER_BY_USERNAME, {"username": username})
     return result.scalars().first()
 
 
+@dataclass(frozen=True)
+class UserRecord:
+    """Session-independent snapshot of a users row, safe to share through user_cache."""
+
+    id: int
+    username: str
+    full_name: str | None
+    hashed_password: str
+
+
+user_cache = TTLCache(
+    maxsize=int(os.environ.get("USER_CACHE_SIZE", "1024")),
+    ttl=float(os.environ.get("USER_CACHE_TTL_SECONDS", "60")),
+)
+
+
+async def get_cached_user(username: str) -> UserRecord | None:
+    """Like get_user_by_username, but served from user_cache; concurrent misses share one query.
+
+    A miss is loaded on its own read session, never on the caller's: the load
+    is shared with other callers and outlives the one that started it.
+    """
+
+    async def load():
+        async with ReadSessionLocal() as db:
+            user = await get_user_by_username(db, username)
+        if user is None:
+            return None
+        return UserRecord(
+            id=cast(int, user.id),
+            username=cast(str, user.username),
+            full_name=cast(Any, user.full_name),
+            hashed_password=cast(str, user.hashed_password),
+        )
+
+    return await user_cache.get_or_load(username, load)
+
+
+# Serialized ItemOut bodies keyed by item id and checked against the row version.
+# The version covers the item's own columns; owner changes are not versioned, so
+# they invalidate through invalidate_user.
+item_fragments = FragmentCache(max_bytes=int(os.environ.get("FRAGMENT_CACHE_MAX_BYTES", str(16 * 1024 * 1024))))
+
+
+def invalidate_user(username: str, user_id: int | None = None) -> None:
+    """Drop a cached user and, given its id, the item fragments embedding it.
+
+    Every write to the users table must call this after committing.
+    """
+    user_cache.invalidate(username)
+    if user_id is not None:
+        item_fragments.invalidate_owner(user_id)
+
+
 async def create_user(db: AsyncSession, user_in: schemas.UserCreate):
     user = models.User(
         username=user_in.username,
@@ -24,27 +156,339 @@ async def create_user(db: AsyncSession, user_in: schemas.UserCreate):
     )
     db.add(user)
     await db.commit()
+    invalidate_user(user_in.username, cast(int, user.id))
     await db.refresh(user)
     return user
 
 
+# Columns handed back by the single-statement write paths
+ITEM_RETURNING = (models.Item.id, models.Item.title, models.Item.description, models.Item.version)
+
+
+def _owned_by(owner_username: str):
+    # Ownership check folded into the write's WHERE clause
+    owner_id = select(models.User.id).where(models.User.username == owner_username).scalar_subquery()
+    return models.Item.owner_id == owner_id
+
+
+async def _insert_item(db: AsyncSession, values: dict[str, Any]):
+    res = await db.execute(insert(models.Item).values(**values).returning(*ITEM_RETURNING))
+    return res.one()
+
+
+# Opt-in group commit for create_item: GROUP_COMMIT_WINDOW_MS > 0 makes concurrent
+# creates share one transaction, flushed after that many milliseconds or once
+# GROUP_COMMIT_MAX_ITEMS are waiting.
+GROUP_COMMIT_WINDOW_MS = float(os.environ.get("GROUP_COMMIT_WINDOW_MS", "0"))
+item_group_committer = (
+    GroupCommitter(
+        AsyncSessionLocal,
+        _insert_item,
+        window=GROUP_COMMIT_WINDOW_MS / 1000,
+        max_items=int(os.environ.get("GROUP_COMMIT_MAX_ITEMS", "64")),
+    )
+    if GROUP_COMMIT_WINDOW_MS > 0
+    else None
+)
+
+# Live feed of the change log (see models.ItemChange). Item writes notify it
+# after committing; main starts and stops its tail task.
+change_broker = ChangeBroker(
+    queue_size=int(os.environ.get("CHANGE_STREAM_QUEUE_SIZE", "256")),
+    poll_interval=float(os.environ.get("CHANGE_STREAM_POLL_SECONDS", "5")),
+)
+
+
 async def create_item(db: AsyncSession, item_in: schemas.ItemCreate, owner_username: str):
-    owner = await get_user_by_username(db, owner_username)
+    """Insert an item with one INSERT ... RETURNING and return the new row (without the owner)."""
+    owner = await get_cached_user(owner_username)
+    if not owner:
+        raise ValueError("owner not found")
+    values = {"title": item_in.title, "description": item_in.description, "owner_id": owner.id}
+    if item_group_committer is not None:
+        # the batch runs on its own session and needs the single writer
+        # connection, which this session must not be holding meanwhile
+        if db.in_transaction():
+            await db.commit()
+        row = await item_group_committer.submit(values)
+    else:
+        row = await _insert_item(db, values)
+        await db.commit()
+    change_broker.notify()
+    return row
+
+
+async def create_items(db: AsyncSession, items_in: list[schemas.ItemCreate], owner_username: str) -> list[int]:
+    """Insert a chunk of items in one transaction and return their ids in input order.
+
+    The rows go out as one executemany, which SQLAlchemy sends as batched
+    multi-row INSERT ... RETURNING statements.
+    """
+    owner = await get_cached_user(owner_username)
     if not owner:
         raise ValueError("owner not found")
-    item = models.Item(title=item_in.title, description=item_in.description, owner_id=owner.id)
-    db.add(item)
+    if not items_in:
+        return []
+    rows = [{"title": item.title, "description": item.description, "owner_id": owner.id} for item in items_in]
+    # sort_by_parameter_order would make SQLAlchemy fall back to one INSERT per
+    # row on SQLite. Inside the write transaction SQLite allocates rowids in
+    # increasing order as VALUES rows are inserted, so sorted ids are input order.
+    res = await db.execute(insert(models.Item).returning(models.Item.id), rows)
+    ids = sorted(res.scalars())
     await db.commit()
-    await db.refresh(item)
-    return item
+    change_broker.notify()
+    return ids
+
 
+@lru_cache(maxsize=None)
+def _item_statement(read_path: str, strategy: str):
+    return _item_select(read_path, strategy).where(models.Item.id == bindparam("item_id"))
 
-async def get_item(db: AsyncSession, item_id: int):
-    q = select(models.Item).where(models.Item.id == item_id).options()
-    result = await db.execute(q)
+
+async def get_item(
+    db: AsyncSession, item_id: int, owner_loading: str | None = None, read_path: str | None = None
+):
+    read_path = read_path or ITEM_READ_PATH
+    result = await db.execute(_item_statement(read_path, owner_loading or OWNER_LOADING), {"item_id": item_id})
+    if read_path == "core":
+        row = result.first()
+        return None if row is None else item_row_to_dict(row)
     return result.scalars().first()
 
 
+# ids per IN (...) query in get_items_by_ids, well below SQLite's bound parameter limit
+ID_BATCH_CHUNK_SIZE = 500
+
+
+@lru_cache(maxsize=None)
+def _items_by_id_statement(read_path: str, strategy: str):
+    return _item_select(read_path, strategy).where(models.Item.id.in_(bindparam("item_ids", expanding=True)))
+
+
+async def get_items_by_ids(
+    db: AsyncSession, item_ids: list[int], owner_loading: str | None = None, read_path: str | None = None
+) -> dict[int, Any]:
+    """Fetch the given items with their owners, one query per ID_BATCH_CHUNK_SIZE ids; missing ids are absent."""
+    read_path = read_path or ITEM_READ_PATH
+    stmt = _items_by_id_statement(read_path, owner_loading or OWNER_LOADING)
+    found: dict[int, Any] = {}
+    for start in range(0, len(item_ids), ID_BATCH_CHUNK_SIZE):
+        result = await db.execute(stmt, {"item_ids": item_ids[start : start + ID_BATCH_CHUNK_SIZE]})
+        if read_path == "core":
+            found.update((row.id, item_row_to_dict(row)) for row in result)
+        else:
+            found.update((item.id, item) for item in result.scalars())
+    return found
+
+
+def encode_cursor(sort_name: str, order: str, sort_value: Any, item_id: int) -> str:
+    # the sort the cursor was issued for travels with it, so it cannot be replayed against another one
+    raw = json.dumps([sort_name, order, sort_value, item_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_name: str, order: str) -> tuple[Any, int]:
+    """Return the (sort value, id) seek position of ``cursor``; ValueError unless it was issued for this sort."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_order, sort_value, item_id = json.loads(raw)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("invalid cursor") from exc
+    if (cursor_sort, cursor_order) != (sort_name, order):
+        raise ValueError("cursor does not match sort_by and order")
+    # bool is an int subclass but never a column value; containers cannot be bound at all
+    if isinstance(sort_value, bool) or not isinstance(sort_value, (str, int, float, type(None))):
+        raise ValueError("invalid cursor")
+    if isinstance(item_id, bool) or not isinstance(item_id, int):
+        raise ValueError("invalid cursor")
+    return sort_value, item_id
+
+
+def fts_match_expression(q: str) -> str | None:
+    """Turn a free-text search term into an FTS5 query matching every word as a prefix."""
+    words = re.findall(r"\w+", q)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+async def count_items(db: AsyncSession) -> int:
+    """Exact number of items, read from the trigger-maintained counter."""
+    res = await db.execute(_COUNT_ITEMS)
+    return res.scalar() or 0
+
+
+def fts_tokens(q: str) -> list[str]:
+    """Split ``q`` into the terms items_fts stores, as FTS5's unicode61 tokenizer does.
+
+    Letters and digits make up terms and everything else, "_" included,
+    separates them; terms are lowercased with diacritics removed.
+    """
+    decomposed = unicodedata.normalize("NFKD", q.lower())
+    folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return re.findall(r"[^\W_]+", folded)
+
+
+async def estimate_matches(db: AsyncSession, q: str) -> int:
+    """Estimate how many items match ``q`` from the FTS term statistics, without running the search.
+
+    Each word matches as a prefix, so its document count is summed over the
+    terms it prefixes; the rarest word bounds the estimate. A document
+    holding several of those terms counts once per term, so this can
+    overshoot; get_items corrects it against the rows it actually found.
+    """
+    estimate = None
+    for word in fts_tokens(q):
+        res = await db.execute(_VOCAB_PREFIX_DOCS, {"prefix_low": word, "prefix_high": word + "\U0010ffff"})
+        docs = res.scalar() or 0
+        estimate = docs if estimate is None else min(estimate, docs)
+    return estimate or 0
+
+
+async def _item_total(db: AsyncSession, q: str | None, match: str | None) -> tuple[int, bool]:
+    if not q:
+        return await count_items(db), False
+    if match is None:
+        return 0, False
+    return await estimate_matches(db, q), True
+
+
+async def _aux_item_total(q: str | None, match: str | None) -> tuple[int, bool]:
+    # The auxiliary connection is held for the total alone, not for the whole
+    # page query, and never while waiting on the main pool, so the two pools
+    # cannot wait on each other and the small aux pool does not cap listing.
+    async with cast(Any, AuxReadSessionLocal)() as count_db:
+        return await _item_total(count_db, q, match)
+
+
+@dataclass(frozen=True)
+class SortSpec:
+    """How the list endpoint orders by one sortable field."""
+
+    column: Any
+    tie_breaker: Any
+    # index whose leading column is ``column``; None for the primary key and FTS rank
+    index: str | None
+    # only meaningful together with a search term; otherwise falls back to id
+    search_only: bool = False
+
+
+SORTABLE_FIELDS: dict[str, SortSpec] = {
+    "id": SortSpec(models.Item.id, models.Item.id, index=None),
+    "title": SortSpec(models.Item.title, models.Item.id, index="ix_items_title"),
+    "owner_id": SortSpec(models.Item.owner_id, models.Item.id, index="ix_items_owner_id"),
+    "relevance": SortSpec(models.items_fts.c.rank, models.Item.id, index=None, search_only=True),
+}
+
+
+async def verify_sort_indexes(db: AsyncSession) -> None:
+    """Fail fast if a registered sort has lost the index that keeps it from sorting the whole table."""
+    for name, spec in SORTABLE_FIELDS.items():
+        if spec.index is None:
+            continue
+        res = await db.execute(text(f"PRAGMA index_info('{spec.index}')"))
+        columns = [row.name for row in res]
+        if not columns or columns[0] != spec.column.key:
+            raise RuntimeError(f"sort_by={name} needs index {spec.index} leading with {spec.column.key}")
+
+
+def _seek_predicate(spec: SortSpec, order: str, after_null: bool):
+    # Rows come back ordered by (column, tie_breaker), so the next page starts
+    # strictly after the last such pair, bound as :sort_value and :tie_value.
+    # SQLite sorts NULLs first, which the row-value comparison cannot express,
+    # so nullable columns are spelled out; after_null means :sort_value is NULL.
+    sort_col, tie = spec.column, spec.tie_breaker
+    sort_value, tie_value = bindparam("sort_value"), bindparam("tie_value")
+    if sort_col is tie:
+        return tie < tie_value if order == "desc" else tie > tie_value
+    if not getattr(sort_col, "nullable", False):
+        key = tuple_(sort_col, tie)
+        return key < tuple_(sort_value, tie_value) if order == "desc" else key > tuple_(sort_value, tie_value)
+    if order == "desc":
+        if after_null:
+            return and_(sort_col.is_(None), tie < tie_value)
+        return or_(
+            sort_col < sort_value,
+            and_(sort_col == sort_value, tie < tie_value),
+            sort_col.is_(None),
+        )
+    if after_null:
+        return or_(sort_col.is_not(None), tie > tie_value)
+    return or_(sort_col > sort_value, and_(sort_col == sort_value, tie > tie_value))
+
+
+def _seek_candidates(spec: SortSpec, order: str):
+    # SQLite only narrows an index range on the first column of a row value, so
+    # (column, id) > (:sort_value, :tie_value) would walk every row sharing
+    # :sort_value before reaching the page. Split in two, each half is an exact
+    # range of the (column, rowid) index: the rest of the current value's run,
+    # then the values after it. One page from each half is enough.
+    sort_col, tie = spec.column, spec.tie_breaker
+    sort_value, tie_value, limit = bindparam("sort_value"), bindparam("tie_value"), bindparam("limit")
+    if order == "desc":
+        same = select(tie).where(sort_col == sort_value, tie < tie_value).order_by(tie.desc())
+        after = select(tie).where(sort_col < sort_value).order_by(sort_col.desc(), tie.desc())
+    else:
+        same = select(tie).where(sort_col == sort_value, tie > tie_value).order_by(tie)
+        after = select(tie).where(sort_col > sort_value).order_by(sort_col, tie)
+    same, after = same.limit(limit).subquery(), after.limit(limit).subquery()
+    return union_all(select(*same.c), select(*after.c))
+
+
+LIST_STATEMENT_CACHE_SIZE = int(os.environ.get("LIST_STATEMENT_CACHE_SIZE", "64"))
+
+
+@lru_cache(maxsize=LIST_STATEMENT_CACHE_SIZE)
+def _list_statement(read_path: str, strategy: str, search: bool, sort_name: str, order: str, seek: str | None):
+    """Build the page query for one shape of list request.
+
+    ``seek`` is None for offset paging, "value" or "null" for a cursor whose
+    sort value is set or NULL. The search term, cursor values, limit and
+    offset stay bound parameters, so each shape is built only once.
+    """
+    spec = SORTABLE_FIELDS[sort_name]
+    query = _item_select(read_path, strategy)
+    if search:
+        fts = models.items_fts
+        query = query.join(fts, fts.c.rowid == models.Item.id).where(
+            fts.c.items_fts.op("MATCH")(bindparam("match"))
+        )
+        if spec.column is models.Item.id:
+            # items_fts returns matches in rowid order and seeks on rowid, so
+            # ordering by its rowid stops after one page instead of sorting
+            # every match of a common term
+            spec = SortSpec(fts.c.rowid, fts.c.rowid, index=None)
+    query = query.add_columns(spec.column.label("sort_value"))
+
+    # the tie-breaker keeps the order, and therefore every cursor, stable
+    direction = desc if order == "desc" else asc
+    if spec.column is spec.tie_breaker:
+        query = query.order_by(direction(spec.column))
+    else:
+        query = query.order_by(direction(spec.column), direction(spec.tie_breaker))
+
+    if seek is None:
+        query = query.offset(bindparam("offset"))
+    elif not search and spec.column is not spec.tie_breaker and not getattr(spec.column, "nullable", True):
+        # the outer ORDER BY then only sorts these at most 2 * limit rows
+        query = query.where(spec.tie_breaker.in_(_seek_candidates(spec, order)))
+    else:
+        query = query.where(_seek_predicate(spec, order, after_null=seek == "null"))
+    return query.limit(bindparam("limit"))
+
+
+def statement_cache_stats() -> dict[str, float]:
+    info = _list_statement.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+        "hit_ratio": info.hits / lookups if lookups else 0.0,
+    }
+
+
 async def get_items(
     db: AsyncSession,
     q: str | None = None,
@@ -52,60 +496,343 @@ async def get_items(
     offset: int = 0,
     sort_by: str | None = "id",
     order: str | None = "asc",
+    cursor: str | None = None,
+    owner_loading: str | None = None,
+    include_total: bool = True,
+    read_path: str | None = None,
 ):
-    query = select(models.Item).join(models.User)
-    count_q = select(func.count(models.Item.id))
-    if q:
-        term = f"%{q}%"
-        query = query.where((models.Item.title.ilike(term)) | (models.Item.description.ilike(term)))
-        count_q = count_q.where((models.Item.title.ilike(term)) | (models.Item.description.ilike(term)))
+    """Return a page of items, the total, the cursor of the next page and whether the total is estimated.
 
-    # sorting
-    sort_col = models.Item.id
-    if sort_by is not None and hasattr(models.Item, sort_by):
-        sort_col = getattr(models.Item, sort_by)
+    Items are dicts shaped like schemas.ItemOut on the "core" read path and
+    models.Item instances on the "orm" one. With ``cursor`` set the page is found by seeking past the encoded
+    ``(sort_col, id)`` pair and ``offset`` is ignored. The total is None
+    unless ``include_total``; it is exact without ``q``. With ``q`` it is
+    estimated, except on an offset page that reaches the end of the matches.
 
-    if order == "desc":
-        query = query.order_by(desc(sort_col))
+    When the auxiliary read pool exists the total is computed on its own
+    connection while the page query runs. The two reads then see separate WAL
+    snapshots, so a write committed in between can show in one but not the
+    other; the total is only a hint for pagination and tolerates that.
+    """
+    sort_name = sort_by or "id"
+    spec = SORTABLE_FIELDS.get(sort_name)
+    if spec is None:
+        raise ValueError(f"cannot sort by {sort_by}")
+
+    match = fts_match_expression(q) if q else None
+    if q and match is None:
+        # nothing in the term can match a word
+        return [], (0 if include_total else None), None, False
+    if spec.search_only and match is None:
+        sort_name = "id"
+
+    order = "desc" if order == "desc" else "asc"
+    params: dict[str, Any] = {"limit": limit}
+    if match is not None:
+        params["match"] = match
+    if cursor is not None:
+        params["sort_value"], params["tie_value"] = decode_cursor(cursor, sort_name, order)
+        seek = "null" if params["sort_value"] is None else "value"
+    else:
+        params["offset"] = offset
+        seek = None
+    read_path = read_path or ITEM_READ_PATH
+    query = _list_statement(read_path, owner_loading or OWNER_LOADING, match is not None, sort_name, order, seek)
+
+    total, total_is_estimate = None, False
+    if not include_total:
+        res = await db.execute(query, params)
+    elif AuxReadSessionLocal is None:
+        total, total_is_estimate = await _item_total(db, q, match)
+        res = await db.execute(query, params)
+    else:
+        (total, total_is_estimate), res = await asyncio.gather(
+            _aux_item_total(q, match),
+            db.execute(query, params),
+        )
+    rows = res.all()
+    if read_path == "core":
+        items = [item_row_to_dict(row) for row in rows]
     else:
-        query = query.order_by(asc(sort_col))
+        items = [row[0] for row in rows]
 
-    total_res = await db.execute(count_q)
-    total = total_res.scalars().first() or 0
+    if total is not None and total_is_estimate:
+        # rows actually found put a floor under it, and a short offset page
+        # that found any rows is the last one, which makes the total exact
+        found = (0 if cursor is not None else offset) + len(rows) if rows else 0
+        if cursor is None and len(rows) < limit and (rows or offset == 0):
+            total, total_is_estimate = found, False
+        else:
+            total = max(total, found)
 
-    res = await db.execute(query.offset(offset).limit(limit))
-    items = res.scalars().unique().all()
-    return items, total
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        last_id = last.id if read_path == "core" else last[0].id
+        next_cursor = encode_cursor(sort_name, order, last.sort_value, cast(int, last_id))
+    return items, total, next_cursor, total_is_estimate
 
 
-async def update_item(db: AsyncSession, item_id: int, item_in: schemas.ItemUpdate, owner_username: str):
-    # Ensure owner owns the item
-    q = select(models.Item).join(models.User).where(models.Item.id == item_id, models.User.username == owner_username)
-    res = await db.execute(q)
-    item = res.scalars().first()
-    if not item:
-        return None
+# Rows fetched per round trip by export_items; also the size of each yielded batch
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "1000"))
+
+
+async def export_items(
+    db: AsyncSession, q: str | None = None, owner: str | None = None, batch_size: int = EXPORT_BATCH_SIZE
+):
+    """Yield every item matching ``q`` and owned by ``owner`` (if given) in id order, as batches of core dicts.
+
+    Rows come from a server-side cursor with yield_per, so only one batch is
+    held in memory at a time whatever the table size.
+    """
+    query = _item_select("core", OWNER_LOADING)
+    params: dict[str, Any] = {}
+    if q:
+        match = fts_match_expression(q)
+        if match is None:
+            return
+        fts = models.items_fts
+        query = query.join(fts, fts.c.rowid == models.Item.id).where(fts.c.items_fts.op("MATCH")(bindparam("match")))
+        params["match"] = match
+    if owner is not None:
+        query = query.where(_users_table.c.username == bindparam("owner"))
+        params["owner"] = owner
+    # in rowid order items_fts streams its matches; ordering by items.id would sort them all first
+    order = models.items_fts.c.rowid if q else _items_table.c.id
+    query = query.order_by(order).execution_options(yield_per=batch_size)
+    result = await db.stream(query, params)
+    try:
+        async for rows in result.partitions():
+            yield [item_row_to_dict(row) for row in rows]
+    finally:
+        await result.close()
+
 
-    # For type-checkers: treat ORM instance as dynamic for attribute writes
-    item_obj = cast(Any, item)
+class VersionMismatch(Exception):
+    """The item exists and is owned by the caller, but not at any of the expected versions."""
 
-    if item_in.title is not None:
-        item_obj.title = item_in.title
-    if item_in.description is not None:
-        item_obj.description = item_in.description
 
-    db.add(item)
+def _write_target(item_id: int, owner_username: str, versions: Collection[int] | None):
+    conditions = [models.Item.id == item_id, _owned_by(owner_username)]
+    if versions is not None:
+        conditions.append(models.Item.version.in_(versions))
+    return conditions
+
+
+async def _check_version_mismatch(db: AsyncSession, item_id: int, owner_username: str, versions) -> None:
+    # A conditional write matched nothing: tell a stale version apart from a missing item
+    if versions is None:
+        return
+    res = await db.execute(select(models.Item.id).where(*_write_target(item_id, owner_username, None)))
+    if res.first() is not None:
+        raise VersionMismatch(item_id)
+
+
+async def update_item(
+    db: AsyncSession,
+    item_id: int,
+    item_in: schemas.ItemUpdate,
+    owner_username: str,
+    versions: Collection[int] | None = None,
+):
+    """Apply an update with one UPDATE ... RETURNING; None if the item is missing or owned by someone else.
+
+    With ``versions`` the update only applies while the row is at one of them,
+    otherwise VersionMismatch is raised.
+    """
+    values = item_in.model_dump(exclude_none=True)
+    if not values:
+        # nothing to write, only report whether the caller owns the item
+        res = await db.execute(select(*ITEM_RETURNING).where(*_write_target(item_id, owner_username, versions)))
+        row = res.first()
+        if row is None:
+            await _check_version_mismatch(db, item_id, owner_username, versions)
+        return row
+
+    stmt = (
+        update(models.Item)
+        .where(*_write_target(item_id, owner_username, versions))
+        .values(**values, version=models.Item.version + 1)
+        .returning(*ITEM_RETURNING)
+        .execution_options(synchronize_session=False)
+    )
+    res = await db.execute(stmt)
+    row = res.first()
+    if row is None:
+        await _check_version_mismatch(db, item_id, owner_username, versions)
+    await db.commit()
+    item_fragments.invalidate(item_id)
+    if row is not None:
+        change_broker.notify()
+    return row
+
+
+async def delete_item(db: AsyncSession, item_id: int, owner_username: str, versions: Collection[int] | None = None):
+    """Delete an owned item; with ``versions``, only while it is at one of them (else VersionMismatch)."""
+    stmt = (
+        delete(models.Item)
+        .where(*_write_target(item_id, owner_username, versions))
+        .returning(models.Item.id)
+        .execution_options(synchronize_session=False)
+    )
+    res = await db.execute(stmt)
+    deleted = res.first() is not None
+    if not deleted:
+        await _check_version_mismatch(db, item_id, owner_username, versions)
+    await db.commit()
+    item_fragments.invalidate(item_id)
+    if deleted:
+        change_broker.notify()
+    return deleted
+
+
+# Change feed over models.ItemChange. Entries only say which item changed; the
+# item's current state is joined in when the feed is read.
+CHANGE_LOG_MAX_ENTRIES = int(os.environ.get("CHANGE_LOG_MAX_ENTRIES", "100000"))
+
+_item_changes_table = cast(Any, models.ItemChange.__table__)
+_CHANGES_FLOOR = select(models.Counter.value).where(models.Counter.name == "item_changes_floor")
+_CHANGES_HEAD = select(func.coalesce(func.max(models.ItemChange.seq), 0))
+_CHANGES_AFTER = (
+    select(
+        _item_changes_table.c.seq,
+        _item_changes_table.c.op,
+        _item_changes_table.c.item_id,
+        *ITEM_CORE_COLUMNS,
+    )
+    .select_from(
+        _item_changes_table.outerjoin(_items_table, _items_table.c.id == _item_changes_table.c.item_id).outerjoin(
+            _users_table, _users_table.c.id == _items_table.c.owner_id
+        )
+    )
+    .where(_item_changes_table.c.seq > bindparam("since"))
+    .order_by(_item_changes_table.c.seq)
+    .limit(bindparam("batch_limit"))
+)
+
+
+class ChangesCompacted(Exception):
+    """Entries after the requested sequence number were compacted away; the client must resync."""
+
+
+@dataclass(frozen=True)
+class ItemChangeEntry:
+    seq: int
+    op: str
+    item_id: int
+    # current state of the item, None once it has been deleted
+    item: dict[str, Any] | None
+
+
+async def get_changes(db: AsyncSession, since: int, limit: int) -> tuple[list[ItemChangeEntry], bool, int]:
+    """Return up to ``limit`` changes after ``since``, whether more follow, and the newest sequence number.
+
+    Raises ChangesCompacted when ``since`` is behind the compaction floor.
+    """
+    res = await db.execute(_CHANGES_AFTER, {"since": since, "batch_limit": limit + 1})
+    rows = res.all()
+    # read after the batch: a compaction that ran before the batch query is
+    # always seen here, so a batch with gaps is never returned
+    res = await db.execute(_CHANGES_FLOOR)
+    if since < (res.scalar() or 0):
+        raise ChangesCompacted(since)
+    head = await get_change_head(db)
+    changes = [
+        ItemChangeEntry(row.seq, row.op, row.item_id, item_row_to_dict(row) if row.id is not None else None)
+        for row in rows[:limit]
+    ]
+    return changes, len(rows) > limit, head
+
+
+async def get_change_head(db: AsyncSession) -> int:
+    """Newest sequence number in the change log, 0 when it is empty."""
+    res = await db.execute(_CHANGES_HEAD)
+    return res.scalar_one()
+
+
+async def compact_changes(db: AsyncSession, max_entries: int = CHANGE_LOG_MAX_ENTRIES) -> int:
+    """Shrink the change log and return how many entries were removed.
+
+    Entries followed by a later entry for the same item are dropped first; a
+    client reading from any point still ends on the item's latest state. If
+    more than ``max_entries`` remain, the oldest go as well and the floor is
+    raised past them.
+    """
+    later = aliased(models.ItemChange)
+    res = await db.execute(
+        delete(models.ItemChange).where(
+            exists().where(later.item_id == models.ItemChange.item_id, later.seq > models.ItemChange.seq)
+        )
+    )
+    removed = res.rowcount
+    res = await db.execute(
+        select(models.ItemChange.seq).order_by(models.ItemChange.seq.desc()).offset(max_entries).limit(1)
+    )
+    cutoff = res.scalar()
+    if cutoff is not None:
+        res = await db.execute(delete(models.ItemChange).where(models.ItemChange.seq <= cutoff))
+        removed += res.rowcount
+        await db.execute(
+            update(models.Counter)
+            .where(models.Counter.name == "item_changes_floor", models.Counter.value < cutoff)
+            .values(value=cutoff)
+        )
     await db.commit()
-    await db.refresh(item)
-    return item
+    return removed
+
+
+async def update_items(db: AsyncSession, item_ids: list[int], item_in: schemas.ItemUpdate, owner_username: str):
+    """Apply the same update to every listed item the caller owns, in one transaction.
+
+    Ownership is part of each statement's WHERE clause
+    (``id IN (...) AND owner_id = :me``), ID_BATCH_CHUNK_SIZE ids at a time.
+    Returns the ITEM_RETURNING rows of the items that were updated.
+    """
+    owner = await get_cached_user(owner_username)
+    if not owner or not item_ids:
+        return []
+    values = item_in.model_dump(exclude_none=True)
+    rows = []
+    for start in range(0, len(item_ids), ID_BATCH_CHUNK_SIZE):
+        target = (models.Item.id.in_(item_ids[start : start + ID_BATCH_CHUNK_SIZE]), models.Item.owner_id == owner.id)
+        if not values:
+            # nothing to write, only report which items the caller owns
+            res = await db.execute(select(*ITEM_RETURNING).where(*target))
+        else:
+            res = await db.execute(
+                update(models.Item)
+                .where(*target)
+                .values(**values, version=models.Item.version + 1)
+                .returning(*ITEM_RETURNING)
+                .execution_options(synchronize_session=False)
+            )
+        rows.extend(res.all())
+    if values:
+        await db.commit()
+        for row in rows:
+            item_fragments.invalidate(row.id)
+        if rows:
+            change_broker.notify()
+    return rows
 
 
-async def delete_item(db: AsyncSession, item_id: int, owner_username: str):
-    q = select(models.Item).join(models.User).where(models.Item.id == item_id, models.User.username == owner_username)
-    res = await db.execute(q)
-    item = res.scalars().first()
-    if not item:
-        return False
-    await db.delete(item)
+async def delete_items(db: AsyncSession, item_ids: list[int], owner_username: str) -> list[int]:
+    """Delete every listed item the caller owns in one transaction and return the deleted ids."""
+    owner = await get_cached_user(owner_username)
+    if not owner or not item_ids:
+        return []
+    deleted: list[int] = []
+    for start in range(0, len(item_ids), ID_BATCH_CHUNK_SIZE):
+        res = await db.execute(
+            delete(models.Item)
+            .where(models.Item.id.in_(item_ids[start : start + ID_BATCH_CHUNK_SIZE]), models.Item.owner_id == owner.id)
+            .returning(models.Item.id)
+            .execution_options(synchronize_session=False)
+        )
+        deleted.extend(res.scalars())
     await db.commit()
-    return True
+    for item_id in deleted:
+        item_fragments.invalidate(item_id)
+    if deleted:
+        change_broker.notify()
+    return deleted
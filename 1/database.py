@@ -1,24 +1,319 @@
+import asyncio
+import os
+import sys
+
+from fastapi import Request
+from sqlalchemy import event, make_url, text
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import NullPool
+from sqlalchemy.schema import CreateTable
+
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite+aiosqlite:///./1.db")
+
+# Connection tuning profiles, applied as pragmas to every new connection and
+# selected with SQLITE_PROFILE. "default" leaves SQLite's own settings alone.
+SQLITE_PROFILES: dict[str, dict[str, str | int]] = {
+    "default": {},
+    # WAL lets readers run alongside the writer; NORMAL only fsyncs at checkpoints
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,  # negative means KiB: 64 MiB of page cache
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # same as production but fsyncs every commit
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+
+SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "production")
+if SQLITE_PROFILE not in SQLITE_PROFILES:
+    raise RuntimeError(f"unknown SQLITE_PROFILE {SQLITE_PROFILE!r}, expected one of {sorted(SQLITE_PROFILES)}")
+
+READ_POOL_SIZE = int(os.environ.get("READ_POOL_SIZE", "4"))
+AUX_READ_POOL_SIZE = int(os.environ.get("AUX_READ_POOL_SIZE", "2"))
+
+# All writes share one connection: with pool_size=1 and no overflow the pool hands
+# it out through its internal asyncio queue, so writers wait their turn in FIFO
+# order on the event loop instead of retrying against SQLite's file lock.
+writer_engine = create_async_engine(DATABASE_URL, echo=False, future=True, pool_size=1, max_overflow=0)
+async_engine = writer_engine
+
 
-DATABASE_URL = "sqlite+aiosqlite:///./1.db"
+def _read_only_url(url_string: str):
+    url = make_url(url_string)
+    if url.database in (None, "", ":memory:") or url.query.get("uri"):
+        return None
+    return url.set(database=f"file:{url.database}", query={**url.query, "mode": "ro", "uri": "true"})
+
+
+# Readers open the same file read-only; under WAL they never block the writer
+# or each other. Databases that cannot be reopened by path share the writer.
+_reader_url = _read_only_url(DATABASE_URL)
+reader_engine = (
+    writer_engine
+    if _reader_url is None
+    else create_async_engine(_reader_url, echo=False, future=True, pool_size=READ_POOL_SIZE, max_overflow=0)
+)
+
+# A second read-only pool for queries that run alongside a request's main read,
+# such as list totals. Callers hold it for that one query and never wait on the
+# main pool meanwhile, so requests waiting here cannot block the ones it serves.
+aux_reader_engine = (
+    None
+    if _reader_url is None
+    else create_async_engine(_reader_url, echo=False, future=True, pool_size=AUX_READ_POOL_SIZE, max_overflow=0)
+)
+
+# Exports keep one connection, and the read snapshot with it, open for as long
+# as the client takes to download the body, so they get their own unpooled
+# engine instead of starving the read pool. EXPORT_MAX_CONCURRENCY bounds how
+# many such connections (and snapshots holding back WAL checkpoints) exist.
+EXPORT_MAX_CONCURRENCY = int(os.environ.get("EXPORT_MAX_CONCURRENCY", "4"))
+export_engine = (
+    None
+    if _reader_url is None
+    else create_async_engine(_reader_url, echo=False, future=True, poolclass=NullPool)
+)
 
-async_engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+
+def _pragma_hook(readonly: bool):
+    def apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_PROFILES[SQLITE_PROFILE].items():
+            # the journal mode is a property of the file, set by the writer
+            if readonly and pragma == "journal_mode":
+                continue
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+    return apply_sqlite_pragmas
+
+
+event.listen(writer_engine.sync_engine, "connect", _pragma_hook(readonly=False))
+if reader_engine is not writer_engine:
+    event.listen(reader_engine.sync_engine, "connect", _pragma_hook(readonly=True))
+if aux_reader_engine is not None:
+    event.listen(aux_reader_engine.sync_engine, "connect", _pragma_hook(readonly=True))
+if export_engine is not None:
+    event.listen(export_engine.sync_engine, "connect", _pragma_hook(readonly=True))
+
+
+# pysqlite (and aiosqlite on top of it) only sends BEGIN ahead of DML, so a
+# SAVEPOINT issued first opens the transaction itself and its RELEASE commits.
+# The writer takes over transaction control (SQLAlchemy's documented recipe):
+# the driver stays in autocommit mode and every transaction starts with an
+# explicit BEGIN, so nested savepoints stay inside one commit.
+def _disable_driver_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+def _emit_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
+event.listen(writer_engine.sync_engine, "connect", _disable_driver_transactions)
+event.listen(writer_engine.sync_engine, "begin", _emit_begin)
 
 AsyncSessionLocal = async_sessionmaker(
-    async_engine,
+    writer_engine,
+    expire_on_commit=False,
+)
+
+ReadSessionLocal = async_sessionmaker(
+    reader_engine,
     expire_on_commit=False,
 )
 
+AuxReadSessionLocal = (
+    None
+    if aux_reader_engine is None
+    else async_sessionmaker(aux_reader_engine, expire_on_commit=False)
+)
+
+ExportSessionLocal = (
+    ReadSessionLocal
+    if export_engine is None
+    else async_sessionmaker(export_engine, expire_on_commit=False)
+)
+
 Base = declarative_base()
 
 
-async def get_session():
+async def get_read_session():
+    async with ReadSessionLocal() as session:
+        yield session
+
+
+async def get_write_session():
     async with AsyncSessionLocal() as session:
         yield session
 
 
+async def get_session(request: Request):
+    # Route by intent: safe methods read from the pool, everything else writes
+    if request.method in ("GET", "HEAD", "OPTIONS"):
+        session_factory = ReadSessionLocal
+    else:
+        session_factory = AsyncSessionLocal
+    async with session_factory() as session:
+        yield session
+
+
+# External-content FTS5 index over items: the triggers keep it in step with
+# every write to items, whatever code path performs it.
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        title, description, content='items', content_rowid='id'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF title, description ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO items_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS items_fts_vocab USING fts5vocab(items_fts, 'row')""",
+]
+
+# Row count of items kept in counters so the unfiltered total is a primary-key
+# lookup. The seed only runs when the row is missing, i.e. before the triggers exist.
+COUNTER_DDL = [
+    "INSERT OR IGNORE INTO counters (name, value) SELECT 'items', count(*) FROM items",
+    """CREATE TRIGGER IF NOT EXISTS items_count_ai AFTER INSERT ON items BEGIN
+        UPDATE counters SET value = value + 1 WHERE name = 'items';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS items_count_ad AFTER DELETE ON items BEGIN
+        UPDATE counters SET value = value - 1 WHERE name = 'items';
+    END""",
+]
+
+
+# Every write to items appends to item_changes inside the writing transaction.
+# Compaction (crud.compact_changes) raises the item_changes_floor counter past
+# the entries it drops for good; clients behind it have to resync.
+CHANGELOG_DDL = [
+    "INSERT OR IGNORE INTO counters (name, value) VALUES ('item_changes_floor', 0)",
+    """CREATE TRIGGER IF NOT EXISTS items_changes_ai AFTER INSERT ON items BEGIN
+        INSERT INTO item_changes (item_id, op) VALUES (new.id, 'insert');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS items_changes_au AFTER UPDATE ON items BEGIN
+        INSERT INTO item_changes (item_id, op) VALUES (new.id, 'update');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS items_changes_ad AFTER DELETE ON items BEGIN
+        INSERT INTO item_changes (item_id, op) VALUES (old.id, 'delete');
+    END""",
+]
+
+def _add_missing_columns(sync_conn):
+    # create_all never alters existing tables; columns added to a model later
+    # must be nullable or carry a server default so existing rows get a value
+    for table in Base.metadata.sorted_tables:
+        existing = {row[1] for row in sync_conn.exec_driver_sql(f"PRAGMA table_info('{table.name}')")}
+        if not existing:
+            continue
+        for col in table.columns:
+            if col.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(sync_conn.dialect)}"
+            if col.server_default is not None:
+                ddl += f" DEFAULT {col.server_default.arg}"
+            if not col.nullable:
+                ddl += " NOT NULL"
+            sync_conn.exec_driver_sql(ddl)
+
+
+def _add_autoincrement(sync_conn):
+    # AUTOINCREMENT cannot be added with ALTER TABLE, so tables created without
+    # it are rebuilt. Dropping the old table drops its indexes and triggers too;
+    # init_db recreates them afterwards. Rowids are kept, so items_fts stays valid.
+    for table in Base.metadata.sorted_tables:
+        if not table.dialect_options["sqlite"]["autoincrement"]:
+            continue
+        row = sync_conn.exec_driver_sql(
+            f"SELECT sql FROM sqlite_master WHERE type = 'table' AND name = '{table.name}'"
+        ).first()
+        if row is None or "AUTOINCREMENT" in row[0].upper():
+            continue
+        rebuilt = f"{table.name}_rebuild"
+        ddl = str(CreateTable(table).compile(dialect=sync_conn.dialect)).strip()
+        sync_conn.exec_driver_sql(ddl.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {rebuilt} ", 1))
+        columns = ", ".join(col.name for col in table.columns)
+        sync_conn.exec_driver_sql(f"INSERT INTO {rebuilt} ({columns}) SELECT {columns} FROM {table.name}")
+        sync_conn.exec_driver_sql(f"DROP TABLE {table.name}")
+        sync_conn.exec_driver_sql(f"ALTER TABLE {rebuilt} RENAME TO {table.name}")
+        if table.name == "items":
+            # ids deleted before the rebuild may be above the current maximum;
+            # the change log still names them unless it was compacted away
+            sync_conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'items'")
+            sync_conn.exec_driver_sql(
+                """INSERT INTO sqlite_sequence (name, seq)
+                SELECT 'items', max(coalesce((SELECT max(id) FROM items), 0),
+                                    coalesce((SELECT max(item_id) FROM item_changes), 0))"""
+            )
+
+
+def _create_missing_indexes(sync_conn):
+    # create_all only builds indexes together with new tables, so indexes added
+    # to existing tables are created here
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
+# Indexes no query uses any more; dropped from existing databases since every
+# write would otherwise still maintain them
+OBSOLETE_INDEXES = ["ix_items_title_nocase"]
+
+
 async def init_db():
     # Create tables
-    async with async_engine.begin() as conn:
+    async with writer_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_add_autoincrement)
+        await conn.run_sync(_create_missing_indexes)
+        for name in OBSOLETE_INDEXES:
+            await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        res = await conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'items_fts'"))
+        fts_exists = res.first() is not None
+        for ddl in FTS_DDL:
+            await conn.execute(text(ddl))
+        # databases created before the index existed need it filled once
+        if not fts_exists:
+            await conn.execute(text("INSERT INTO items_fts(items_fts) VALUES ('rebuild')"))
+        for ddl in COUNTER_DDL + CHANGELOG_DDL:
+            await conn.execute(text(ddl))
+
+
+async def rebuild_search_index():
+    """Rebuild items_fts from the items table, e.g. after writes that bypassed the triggers."""
+    try:
+        async with writer_engine.begin() as conn:
+            for ddl in FTS_DDL:
+                await conn.execute(text(ddl))
+            await conn.execute(text("INSERT INTO items_fts(items_fts) VALUES ('rebuild')"))
+    finally:
+        await writer_engine.dispose()
+
+
+if __name__ == "__main__":
+    # python database.py rebuild-fts
+    if sys.argv[1:] == ["rebuild-fts"]:
+        asyncio.run(rebuild_search_index())
+    else:
+        sys.exit("usage: python database.py rebuild-fts")
@@ -0,0 +1,141 @@
+import logging
+import logging.handlers
+import queue
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+access_logger = logging.getLogger("assignments.access")
+access_logger.propagate = False
+
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_listener: logging.handlers.QueueListener | None = None
+
+
+class RequestTimings:
+    """Nanosecond counters for one request, shared through the request_timings context var."""
+
+    __slots__ = ("start_ns", "db_ns", "serialize_ns")
+
+    def __init__(self) -> None:
+        self.start_ns = time.perf_counter_ns()
+        self.db_ns = 0
+        self.serialize_ns = 0
+
+
+request_timings: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_ns", []).append(time.perf_counter_ns())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_ns"].pop()
+    timings = request_timings.get()
+    if timings is not None:
+        timings.db_ns += time.perf_counter_ns() - started
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Attribute time spent executing SQL on ``engine`` to the current request's db segment."""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def timed_serialize():
+    """Charge the enclosed block to the current request's serialize segment."""
+    started = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        timings = request_timings.get()
+        if timings is not None:
+            timings.serialize_ns += time.perf_counter_ns() - started
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that charges its rendering time to the current request's serialize segment."""
+
+    def render(self, content) -> bytes:
+        with timed_serialize():
+            return super().render(content)
+
+
+def _ms(ns: int) -> str:
+    return f"{ns / 1_000_000:.3f}"
+
+
+class TimingMiddleware:
+    """Pure ASGI middleware adding X-Process-Time and Server-Timing headers plus an access log line.
+
+    Unlike ``@app.middleware("http")`` it does not wrap the request in Starlette's
+    BaseHTTPMiddleware, so no extra task or body stream is created per request.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed = time.perf_counter_ns() - timings.start_ns
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", str(elapsed / 1_000_000_000))
+                headers.append("X-Custom-Header", "AssignmentsApp")
+                headers.append(
+                    "Server-Timing",
+                    f"app;dur={_ms(elapsed)}, db;dur={_ms(timings.db_ns)}, serialize;dur={_ms(timings.serialize_ns)}",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
+            # QueueHandler only enqueues; formatting and I/O happen on the listener thread
+            access_logger.info(
+                "%s %s %s %.3fms",
+                scope["method"],
+                scope["path"],
+                status_code,
+                (time.perf_counter_ns() - timings.start_ns) / 1_000_000,
+            )
+
+
+def start_access_log() -> None:
+    global _log_listener
+    if _log_listener is not None:
+        return
+    access_logger.setLevel(logging.INFO)
+    access_logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    _log_listener = logging.handlers.QueueListener(_log_queue, stream)
+    _log_listener.start()
+
+
+def stop_access_log() -> None:
+    global _log_listener
+    if _log_listener is None:
+        return
+    _log_listener.stop()
+    access_logger.handlers.clear()
+    _log_listener = None
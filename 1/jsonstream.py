@@ -0,0 +1,106 @@
+import codecs
+import json
+from typing import Any, AsyncIterable, AsyncIterator
+
+# Longest single value accepted while waiting for the rest of it to arrive
+MAX_VALUE_CHARS = 1 << 20
+
+_WHITESPACE = " \t\r\n"
+
+
+async def _with_eof(chunks: AsyncIterable[bytes]) -> AsyncIterator[tuple[bytes, bool]]:
+    async for chunk in chunks:
+        yield chunk, False
+    yield b"", True
+
+
+async def iter_ndjson_lines(chunks: AsyncIterable[bytes], max_value_chars: int = MAX_VALUE_CHARS) -> AsyncIterator[str]:
+    """Yield each non-blank line of a newline-delimited byte stream, without its newline.
+
+    Lines are not parsed, so a caller can report an invalid one and go on with
+    the next. Raises ValueError when a line grows past max_value_chars.
+    """
+    decode = codecs.getincrementaldecoder("utf-8")().decode
+    buffer = ""
+    async for chunk, eof in _with_eof(chunks):
+        buffer += decode(chunk, final=eof)
+        lines = buffer.split("\n")
+        buffer = "" if eof else lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+        if len(buffer) > max_value_chars:
+            raise ValueError("line too long")
+
+
+async def iter_ndjson(chunks: AsyncIterable[bytes], max_value_chars: int = MAX_VALUE_CHARS) -> AsyncIterator[Any]:
+    """Yield the value on each non-blank line of a newline-delimited JSON byte stream.
+
+    Raises ValueError (json.JSONDecodeError for syntax errors) at the first
+    line that is not valid JSON.
+    """
+    async for line in iter_ndjson_lines(chunks, max_value_chars):
+        yield json.loads(line)
+
+
+async def iter_json_array(chunks: AsyncIterable[bytes], max_value_chars: int = MAX_VALUE_CHARS) -> AsyncIterator[Any]:
+    """Yield the elements of a top-level JSON array as they arrive, without buffering the whole body.
+
+    Raises ValueError when the stream is not a single well-formed array.
+    """
+    decode = codecs.getincrementaldecoder("utf-8")().decode
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    # "[" -> "first" -> ("separator" <-> "value")* -> "done"
+    expecting = "["
+    async for chunk, eof in _with_eof(chunks):
+        buffer = buffer[pos:] + decode(chunk, final=eof)
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos == len(buffer):
+                break
+            if expecting == "[":
+                if buffer[pos] != "[":
+                    raise ValueError("expected a JSON array")
+                pos += 1
+                expecting = "first"
+            elif expecting in ("first", "value"):
+                if expecting == "first" and buffer[pos] == "]":
+                    pos += 1
+                    expecting = "done"
+                    continue
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # most likely cut off by the chunk boundary
+                    if eof:
+                        raise
+                    value, end = None, None
+                if not eof:
+                    follow = end
+                    while follow is not None and follow < len(buffer) and buffer[follow] in _WHITESPACE:
+                        follow += 1
+                    # without a "," or "]" after it the value may continue in the
+                    # next chunk, e.g. a number cut off after its first digits
+                    if follow is None or follow == len(buffer) or buffer[follow] not in ",]":
+                        if len(buffer) - pos > max_value_chars:
+                            raise ValueError("JSON array element too long")
+                        break
+                yield value
+                pos = end
+                expecting = "separator"
+            elif expecting == "separator":
+                if buffer[pos] == ",":
+                    expecting = "value"
+                elif buffer[pos] == "]":
+                    expecting = "done"
+                else:
+                    raise ValueError("expected ',' or ']' in JSON array")
+                pos += 1
+            else:
+                raise ValueError("unexpected data after JSON array")
+    if expecting != "done":
+        raise ValueError("truncated JSON array")
@@ -1,24 +1,106 @@
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import zlib
 from contextlib import asynccontextmanager
+from enum import Enum
 
-from fastapi import FastAPI, Depends, HTTPException, status, Query, Path, Body
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Path, Body, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
-from fastapi.responses import JSONResponse
-import time
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import pydantic_core
+from pydantic import ValidationError
 from typing import List, Optional
-from database import async_engine, init_db, get_session
-import crud, schemas, auth
+from database import (
+    EXPORT_MAX_CONCURRENCY,
+    AsyncSessionLocal,
+    ExportSessionLocal,
+    ReadSessionLocal,
+    aux_reader_engine,
+    export_engine,
+    reader_engine,
+    writer_engine,
+    init_db,
+    get_read_session,
+    get_session,
+)
+from instrumentation import (
+    TimedJSONResponse,
+    TimingMiddleware,
+    instrument_engine,
+    start_access_log,
+    stop_access_log,
+    timed_serialize,
+)
+import crud, schemas, auth, jsonstream
+
+logger = logging.getLogger("assignments")
+
+# Seconds between change log compactions; 0 disables the background task
+CHANGE_LOG_COMPACT_INTERVAL_SECONDS = float(os.environ.get("CHANGE_LOG_COMPACT_INTERVAL_SECONDS", "60"))
+# Rows per transaction in POST /items/bulk
+BULK_INSERT_CHUNK_SIZE = int(os.environ.get("BULK_INSERT_CHUNK_SIZE", "1000"))
+# Most ids accepted by one /items/batch request
+ITEM_BATCH_MAX_SIZE = int(os.environ.get("ITEM_BATCH_MAX_SIZE", "1000"))
+# Idle /items/stream connections get a comment line this often
+CHANGE_STREAM_HEARTBEAT_SECONDS = float(os.environ.get("CHANGE_STREAM_HEARTBEAT_SECONDS", "15"))
+CHANGE_STREAM_BATCH = 100
+
+
+async def compact_change_log_periodically(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with AsyncSessionLocal() as db:
+                await crud.compact_changes(db)
+        except Exception:
+            # e.g. the database was busy; the next round retries
+            logger.exception("change log compaction failed")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: create tables
     await init_db()
+    async with ReadSessionLocal() as db:
+        await crud.verify_sort_indexes(db)
+    start_access_log()
+    async with ReadSessionLocal() as db:
+        head = await crud.get_change_head(db)
+    crud.change_broker.start(_load_change_events, _change_head, head)
+    compactor = None
+    if CHANGE_LOG_COMPACT_INTERVAL_SECONDS > 0:
+        compactor = asyncio.create_task(compact_change_log_periodically(CHANGE_LOG_COMPACT_INTERVAL_SECONDS))
     yield
-    # Shutdown: nothing specific needed for now
+    # Shutdown: stop compacting and broadcasting, flush queued access log lines
+    if compactor is not None:
+        compactor.cancel()
+        try:
+            await compactor
+        except asyncio.CancelledError:
+            pass
+    await crud.change_broker.stop()
+    stop_access_log()
+
 
+instrument_engine(writer_engine)
+if reader_engine is not writer_engine:
+    instrument_engine(reader_engine)
+if aux_reader_engine is not None:
+    instrument_engine(aux_reader_engine)
+if export_engine is not None:
+    instrument_engine(export_engine)
 
-app = FastAPI(title="Assignments API - FastAPI Fundamentals", lifespan=lifespan)
+app = FastAPI(
+    title="Assignments API - FastAPI Fundamentals",
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,19 +109,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-@app.middleware("http")
-async def timing_middleware(request, call_next):
-    """Middleware that logs request processing time and adds a header."""
-    start = time.time()
-    # pre-request logic
-    print(f"Incoming request: {request.method} {request.url}")
-    response = await call_next(request)
-    # post-request logic
-    process_time = time.time() - start
-    response.headers["X-Process-Time"] = str(process_time)
-    response.headers["X-Custom-Header"] = "AssignmentsApp"
-    print(f"Completed in {process_time:.4f}s -> status {response.status_code}")
-    return response
+# Logs request processing time and adds timing headers
+app.add_middleware(TimingMiddleware)
 
 
 # Authentication routes
@@ -56,11 +127,235 @@ async def protected_route(current_user: schemas.UserOut = Depends(auth.get_curre
     return {"msg": f"Hello, {current_user.username}. You accessed a protected route."}
 
 
+def _owned_item_out(row, owner: schemas.UserOut) -> schemas.ItemOut:
+    # Write paths return the item columns only; the owner is the caller
+    return schemas.ItemOut(id=row.id, title=row.title, description=row.description, owner=owner)
+
+
+def _item_model(item) -> schemas.ItemOut:
+    # Core row dicts and ORM instances alike; validation runs in pydantic-core and
+    # is about twice as fast as model_construct, which builds the models in Python
+    # (see bench/serialize.py)
+    return schemas.ItemOut.model_validate(item)
+
+
+def _item_key(item) -> tuple[int, int, int]:
+    # (id, version, owner id) of a core-path dict or an ORM item
+    if isinstance(item, dict):
+        return item["id"], item["version"], item["owner"]["id"]
+    return item.id, item.version, item.owner_id
+
+
+def _item_fragment(item) -> bytes:
+    # Serialized ItemOut for one row, reused from crud.item_fragments while the
+    # row version (and owner) is unchanged
+    item_id, version, owner_id = _item_key(item)
+    fragment = crud.item_fragments.get(item_id, version)
+    if fragment is None:
+        model = _item_model(item)
+        fragment = model.__pydantic_serializer__.to_json(model)
+        crud.item_fragments.put(item_id, version, owner_id, fragment)
+    return fragment
+
+
+def _change_fragment(change: crud.ItemChangeEntry) -> bytes:
+    # One schemas.ItemChange, with the item taken from the fragment cache
+    item = _item_fragment(change.item) if change.item is not None else b"null"
+    return b'{"seq":%d,"op":"%s","item_id":%d,"item":%s}' % (change.seq, change.op.encode(), change.item_id, item)
+
+
+def _sse_event(change: crud.ItemChangeEntry) -> bytes:
+    return b"id: %d\nevent: change\ndata: %s\n\n" % (change.seq, _change_fragment(change))
+
+
+async def _load_change_events(after: int) -> tuple[list[tuple[int, bytes]], bool]:
+    async with ReadSessionLocal() as db:
+        changes, has_more, _ = await crud.get_changes(db, after, CHANGE_STREAM_BATCH)
+    return [(change.seq, _sse_event(change)) for change in changes], has_more
+
+
+async def _change_head() -> int:
+    async with ReadSessionLocal() as db:
+        return await crud.get_change_head(db)
+
+
+def _json_response(body: bytes, etag: str) -> Response:
+    # Returning a Response skips FastAPI's response_model validation and encoding pass
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+def _item_etag(item_id: int, version: int) -> str:
+    # never repeats: item ids are not reused after a delete (see models.Item)
+    return f'"{item_id}-{version}"'
+
+
+def _list_etag(items, *envelope) -> str:
+    # A page body is fully determined by its items' ids and versions plus the
+    # envelope fields, so hashing those gives a strong validator without rendering
+    digest = hashlib.blake2b(repr(([_item_key(item) for item in items], envelope)).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def _not_modified(if_none_match: Optional[str], etag: str) -> Optional[Response]:
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    if if_none_match is None:
+        return None
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" in candidates or etag in candidates:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
+
+
+def _if_match_versions(if_match: Optional[str], item_id: int) -> Optional[set[int]]:
+    """Versions of ``item_id`` accepted by an If-Match header; None when the write is unconditional.
+
+    If-Match uses strong comparison, so weak tags and tags for other items
+    never match and an empty set fails the precondition.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    prefix = f'"{item_id}-'
+    versions = set()
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag.startswith(prefix) and tag.endswith('"') and tag[len(prefix):-1].isdigit():
+            versions.add(int(tag[len(prefix):-1]))
+    return versions
+
+
+def _precondition_failed() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Item has been modified")
+
+
+# Values accepted by sort_by; anything else is rejected with a 422
+SortField = Enum("SortField", {name: name for name in crud.SORTABLE_FIELDS}, type=str)
+
+
 # Item CRUD + list with pagination, sorting and search
 @app.post("/items/", response_model=schemas.ItemOut)
-async def create_item(item_in: schemas.ItemCreate, db=Depends(get_session), current_user: schemas.UserOut = Depends(auth.get_current_user)):
+async def create_item(
+    item_in: schemas.ItemCreate,
+    response: Response,
+    db=Depends(get_session),
+    current_user: schemas.UserOut = Depends(auth.get_current_user),
+):
     item = await crud.create_item(db, item_in, owner_username=current_user.username)
-    return item
+    response.headers["ETag"] = _item_etag(item.id, item.version)
+    return _owned_item_out(item, current_user)
+
+
+@app.post("/items/bulk", response_model=schemas.ItemBulkResult)
+async def create_items_bulk(
+    request: Request,
+    db=Depends(get_session),
+    current_user: schemas.UserOut = Depends(auth.get_current_user),
+):
+    """Create items from an NDJSON body (Content-Type application/x-ndjson) or a JSON array.
+
+    The body is parsed as it arrives. Rows are validated as schemas.ItemCreate
+    and inserted in transactions of BULK_INSERT_CHUNK_SIZE valid rows, so
+    chunks already committed stay when a later row fails. Invalid rows,
+    including NDJSON lines that are not JSON, are reported and skipped. A
+    malformed JSON array (or undecodable body) is reported as one failed row
+    at the point it was found and stops the import: ``complete`` is then
+    false and nothing after that point was read.
+    """
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    if ndjson:
+        rows = jsonstream.iter_ndjson_lines(request.stream())
+    else:
+        rows = jsonstream.iter_json_array(request.stream())
+    ids: list[Optional[int]] = []
+    errors: list[schemas.ItemBulkError] = []
+    complete = True
+    # (position in ids, validated row) waiting for the next insert
+    pending: list[tuple[int, schemas.ItemCreate]] = []
+
+    async def flush():
+        new_ids = await crud.create_items(db, [item for _, item in pending], current_user.username)
+        for (index, _), new_id in zip(pending, new_ids):
+            ids[index] = new_id
+        pending.clear()
+
+    def fail(exc_errors: list[dict]):
+        errors.append(schemas.ItemBulkError(index=len(ids), errors=exc_errors))
+        ids.append(None)
+
+    while True:
+        try:
+            raw = await anext(rows)
+            if ndjson:
+                raw = json.loads(raw)
+        except StopAsyncIteration:
+            break
+        except json.JSONDecodeError as exc:
+            fail([{"type": "json_invalid", "msg": str(exc)}])
+            if ndjson:
+                continue
+            complete = False
+            break
+        except ValueError as exc:
+            fail([{"type": "json_invalid", "msg": str(exc)}])
+            complete = False
+            break
+        try:
+            pending.append((len(ids), schemas.ItemCreate.model_validate(raw)))
+        except ValidationError as exc:
+            fail([{"type": e["type"], "loc": e["loc"], "msg": e["msg"]} for e in exc.errors()])
+            continue
+        ids.append(None)
+        if len(pending) >= BULK_INSERT_CHUNK_SIZE:
+            await flush()
+    await flush()
+    created = sum(new_id is not None for new_id in ids)
+    return schemas.ItemBulkResult(
+        created=created, failed=len(ids) - created, ids=ids, errors=errors, complete=complete
+    )
+
+
+def _batch_ids(item_ids: list[int]) -> list[int]:
+    # each id once, in the order first requested
+    item_ids = list(dict.fromkeys(item_ids))
+    if len(item_ids) > ITEM_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {ITEM_BATCH_MAX_SIZE} ids per batch")
+    return item_ids
+
+
+def _bulk_write_result(item_ids: list[int], affected) -> schemas.ItemBulkWriteResult:
+    affected = set(affected)
+    return schemas.ItemBulkWriteResult(
+        ids=[item_id for item_id in item_ids if item_id in affected],
+        skipped=[item_id for item_id in item_ids if item_id not in affected],
+    )
+
+
+@app.patch("/items/bulk", response_model=schemas.ItemBulkWriteResult)
+async def update_items_bulk(
+    batch: schemas.ItemBulkUpdate,
+    db=Depends(get_session),
+    current_user: schemas.UserOut = Depends(auth.get_current_user),
+):
+    """Apply ``changes`` to every listed item owned by the caller, in one transaction."""
+    item_ids = _batch_ids(batch.ids)
+    rows = await crud.update_items(db, item_ids, batch.changes, current_user.username)
+    return _bulk_write_result(item_ids, (row.id for row in rows))
+
+
+@app.delete("/items/bulk", response_model=schemas.ItemBulkWriteResult)
+async def delete_items_bulk(
+    batch: schemas.ItemBatchRequest,
+    db=Depends(get_session),
+    current_user: schemas.UserOut = Depends(auth.get_current_user),
+):
+    """Delete every listed item owned by the caller, in one transaction."""
+    item_ids = _batch_ids(batch.ids)
+    deleted = await crud.delete_items(db, item_ids, current_user.username)
+    return _bulk_write_result(item_ids, deleted)
+
+
+@app.get("/items/sortable")
+async def list_sortable_fields():
+    return {"sortable_fields": list(crud.SORTABLE_FIELDS)}
 
 
 @app.get("/items/", response_model=schemas.ItemList)
@@ -68,42 +363,299 @@ async def list_items(
     q: Optional[str] = Query(None, description="Search term (in title or description)"),
     limit: int = Query(10, gt=0, le=100),
     offset: int = Query(0, ge=0),
-    sort_by: Optional[str] = Query("id", description="Field to sort by"),
+    sort_by: SortField = Query(SortField.id, description="Field to sort by, or 'relevance' when searching"),
     order: Optional[str] = Query("asc", regex="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from a previous page; replaces offset"),
+    include_total: bool = Query(True, description="Set to false to skip computing total"),
+    if_none_match: Optional[str] = Header(None),
     db=Depends(get_session),
 ):
-    items, total = await crud.get_items(
-        db,
-        q=q,
-        limit=limit,
-        offset=offset,
-        sort_by=sort_by,
-        order=order,
+    try:
+        items, total, next_cursor, total_is_estimate = await crud.get_items(
+            db,
+            q=q,
+            limit=limit,
+            offset=offset,
+            sort_by=sort_by.value,
+            order=order,
+            cursor=cursor,
+            include_total=include_total,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    etag = _list_etag(items, total, total_is_estimate, limit, offset, next_cursor)
+    not_modified = _not_modified(if_none_match, etag)
+    if not_modified is not None:
+        return not_modified
+    with timed_serialize():
+        # ItemList is assembled from per-item fragments; the remaining fields are
+        # serialized in schemas.ItemList field order and spliced in after "items"
+        rest = pydantic_core.to_json(
+            {
+                "total": total,
+                "total_is_estimate": total_is_estimate,
+                "limit": limit,
+                "offset": offset,
+                "next_cursor": next_cursor,
+            }
+        )
+        body = b'{"items":[' + b",".join(_item_fragment(item) for item in items) + b"]," + rest[1:]
+    return _json_response(body, etag)
+
+
+@app.get("/items/changes", response_model=schemas.ItemChangeBatch)
+async def list_item_changes(
+    since: int = Query(0, ge=0, description="Sequence number of the last change already applied"),
+    limit: int = Query(100, gt=0, le=1000),
+    db=Depends(get_session),
+):
+    """Inserts, updates and deletes after ``since``, oldest first, with each item's current state.
+
+    A client without local state reads ``head``, loads /items/ and then syncs
+    from that head. 410 means changes after ``since`` were compacted away and
+    the client has to start over the same way.
+    """
+    try:
+        changes, has_more, head = await crud.get_changes(db, since, limit)
+    except crud.ChangesCompacted:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Changes since this point were compacted; resync")
+    with timed_serialize():
+        entries = [_change_fragment(change) for change in changes]
+        rest = pydantic_core.to_json(
+            {"next_since": changes[-1].seq if changes else since, "has_more": has_more, "head": head}
+        )
+        body = b'{"changes":[' + b",".join(entries) + b"]," + rest[1:]
+    return Response(content=body, media_type="application/json")
+
+
+EXPORT_CSV_COLUMNS = ("id", "title", "description", "owner_id", "owner_username", "owner_full_name")
+
+
+def _export_ndjson(batch: list[dict]) -> bytes:
+    # Serialized directly rather than through crud.item_fragments, so a full
+    # export does not evict the fragments of hot items
+    serializer = schemas.ItemOut.__pydantic_serializer__
+    return b"".join(serializer.to_json(_item_model(item)) + b"\n" for item in batch)
+
+
+def _export_csv(batch: list[dict]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        (
+            item["id"],
+            item["title"],
+            item["description"],
+            item["owner"]["id"],
+            item["owner"]["username"],
+            item["owner"]["full_name"],
+        )
+        for item in batch
+    )
+    return buffer.getvalue().encode()
+
+
+_export_slots = asyncio.Semaphore(EXPORT_MAX_CONCURRENCY)
+
+
+async def _export_stream(q: Optional[str], owner: Optional[str], format: str, compress: bool):
+    # gzip framing (wbits=31) compressed chunk by chunk as batches are produced
+    encoder = zlib.compressobj(wbits=31) if compress else None
+    encode = _export_csv if format == "csv" else _export_ndjson
+    chunks = [] if format == "ndjson" else [",".join(EXPORT_CSV_COLUMNS).encode() + b"\r\n"]
+    # own session: a request dependency would be closed before the body is streamed.
+    # It comes from the export engine, never the read pool; exports beyond
+    # EXPORT_MAX_CONCURRENCY wait for a slot before opening a connection.
+    async with _export_slots, ExportSessionLocal() as db:
+        async for batch in crud.export_items(db, q=q, owner=owner):
+            chunks.append(encode(batch))
+            chunk = b"".join(chunks)
+            chunks.clear()
+            if encoder is not None:
+                chunk = encoder.compress(chunk)
+            if chunk:
+                yield chunk
+    tail = b"".join(chunks)
+    if encoder is not None:
+        tail = encoder.compress(tail) + encoder.flush()
+    if tail:
+        yield tail
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    # Accept-Encoding is a list of codings with optional q-values (RFC 9110
+    # 12.5.3); q=0 refuses a coding, and "*" stands for any not listed
+    qualities: dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+@app.get("/items/export")
+async def export_items(
+    q: Optional[str] = Query(None, description="Search term (in title or description)"),
+    owner: Optional[str] = Query(None, description="Only items owned by this username"),
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    accept_encoding: Optional[str] = Header(None),
+):
+    """Stream every matching item in id order as NDJSON (schemas.ItemOut per line) or CSV.
+
+    The body is gzip-encoded when the client accepts it.
+    """
+    compress = _accepts_gzip(accept_encoding)
+    headers = {
+        "Content-Disposition": f'attachment; filename="items.{"csv" if format == "csv" else "ndjson"}"',
+        # the encoding depends on the request header, compressed or not
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        _export_stream(q, owner, format, compress),
+        media_type="text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson",
+        headers=headers,
     )
-    # Convert ORM items into Pydantic models for type safety
-    items_out = [schemas.ItemOut.model_validate(item) for item in items]
-    return schemas.ItemList(items=items_out, total=total, limit=limit, offset=offset)
+
+
+async def _change_stream(last_event_id: Optional[int]):
+    # Subscribe before replaying so nothing published meanwhile is missed;
+    # anything seen twice is skipped by comparing sequence numbers
+    subscription = crud.change_broker.subscribe()
+    sent = crud.change_broker.last_seq if last_event_id is None else last_event_id
+    try:
+        yield b": connected\n\n"
+        more = last_event_id is not None
+        while more:
+            try:
+                # short-lived session: the open stream must not pin a pooled connection
+                async with ReadSessionLocal() as db:
+                    changes, more, _ = await crud.get_changes(db, sent, CHANGE_STREAM_BATCH)
+            except crud.ChangesCompacted:
+                yield b"event: resync\ndata: {}\n\n"
+                return
+            if changes:
+                yield b"".join(_sse_event(change) for change in changes)
+                sent = changes[-1].seq
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), CHANGE_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                # dropped as a slow consumer; the client reconnects with Last-Event-ID
+                return
+            seq, data = event
+            if seq > sent:
+                yield data
+                sent = seq
+    finally:
+        crud.change_broker.unsubscribe(subscription)
+
+
+@app.get("/items/stream")
+async def stream_item_changes(last_event_id: Optional[str] = Header(None)):
+    """Server-Sent Events feed of item changes; each event is a schemas.ItemChange with its seq as id.
+
+    Reconnecting with Last-Event-ID replays what was missed from the change
+    log. A ``resync`` event means that part of the log was compacted away
+    (see /items/changes).
+    """
+    resume = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    return StreamingResponse(
+        _change_stream(resume),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _item_batch_response(item_ids: list[int], db) -> Response:
+    item_ids = _batch_ids(item_ids)
+    found = await crud.get_items_by_ids(db, item_ids)
+    with timed_serialize():
+        fragments = [_item_fragment(found[item_id]) for item_id in item_ids if item_id in found]
+        missing = pydantic_core.to_json([item_id for item_id in item_ids if item_id not in found])
+        body = b'{"items":[' + b",".join(fragments) + b'],"missing":' + missing + b"}"
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/items/batch", response_model=schemas.ItemBatch)
+async def get_items_batch(
+    ids: str = Query(..., description="Comma-separated item ids"),
+    db=Depends(get_session),
+):
+    """Fetch several items at once; use POST /items/batch for lists too long for a URL."""
+    try:
+        item_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    return await _item_batch_response(item_ids, db)
+
+
+@app.post("/items/batch", response_model=schemas.ItemBatch)
+async def post_items_batch(batch: schemas.ItemBatchRequest, db=Depends(get_read_session)):
+    # a read sent as POST only for the body: it must not queue for the writer
+    return await _item_batch_response(batch.ids, db)
 
 
 @app.get("/items/{item_id}", response_model=schemas.ItemOut)
-async def get_item(item_id: int = Path(..., gt=0), db=Depends(get_session)):
+async def get_item(item_id: int = Path(..., gt=0), if_none_match: Optional[str] = Header(None), db=Depends(get_session)):
     item = await crud.get_item(db, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
-    return item
+    etag = _item_etag(*_item_key(item)[:2])
+    not_modified = _not_modified(if_none_match, etag)
+    if not_modified is not None:
+        return not_modified
+    with timed_serialize():
+        body = _item_fragment(item)
+    return _json_response(body, etag)
 
 
 @app.put("/items/{item_id}", response_model=schemas.ItemOut)
-async def update_item(item_id: int, item_in: schemas.ItemUpdate, db=Depends(get_session), current_user: schemas.UserOut = Depends(auth.get_current_user)):
-    item = await crud.update_item(db, item_id, item_in, current_user.username)
+async def update_item(
+    item_id: int,
+    item_in: schemas.ItemUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db=Depends(get_session),
+    current_user: schemas.UserOut = Depends(auth.get_current_user),
+):
+    try:
+        item = await crud.update_item(db, item_id, item_in, current_user.username, _if_match_versions(if_match, item_id))
+    except crud.VersionMismatch:
+        raise _precondition_failed()
     if not item:
         raise HTTPException(status_code=404, detail="Item not found or not owned by you")
-    return item
+    response.headers["ETag"] = _item_etag(item.id, item.version)
+    return _owned_item_out(item, current_user)
 
 
 @app.delete("/items/{item_id}")
-async def delete_item(item_id: int, db=Depends(get_session), current_user: schemas.UserOut = Depends(auth.get_current_user)):
-    ok = await crud.delete_item(db, item_id, current_user.username)
+async def delete_item(
+    item_id: int,
+    if_match: Optional[str] = Header(None),
+    db=Depends(get_session),
+    current_user: schemas.UserOut = Depends(auth.get_current_user),
+):
+    try:
+        ok = await crud.delete_item(db, item_id, current_user.username, _if_match_versions(if_match, item_id))
+    except crud.VersionMismatch:
+        raise _precondition_failed()
     if not ok:
         raise HTTPException(status_code=404, detail="Item not found or not owned by you")
     return JSONResponse({"ok": True})
@@ -114,6 +666,20 @@ async def read_users_me(current_user: schemas.UserOut = Depends(auth.get_current
     return current_user
 
 
+@app.get("/metrics")
+async def read_metrics():
+    """In-process cache and batching counters."""
+    metrics = {
+        "user_cache": crud.user_cache.stats(),
+        "list_statement_cache": crud.statement_cache_stats(),
+        "item_fragment_cache": crud.item_fragments.stats(),
+        "change_stream": crud.change_broker.stats(),
+    }
+    if crud.item_group_committer is not None:
+        metrics["item_group_commit"] = crud.item_group_committer.stats()
+    return metrics
+
+
 @app.post("/users/", response_model=schemas.UserOut)
 async def create_user(user_in: schemas.UserCreate, db=Depends(get_session)):
     user = await crud.create_user(db, user_in)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, column, table
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -15,11 +15,60 @@ class User(Base):
 
 
 class Item(Base):
+    """An item owned by a user.
+
+    id is AUTOINCREMENT so a deleted item's id is never handed out again:
+    (id, version) then names one state of one item for good, which ETags
+    rely on.
+    """
+
     __tablename__ = "items"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), index=True, nullable=False)
     description = Column(Text, nullable=True)
-    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # SQLite appends the rowid to every index entry, so ix_items_owner_id is an
+    # (owner_id, id) index and ix_items_title a (title, id) one. They return rows
+    # already in (column, id) order; a keyset page still has to seek the two
+    # parts separately (see crud._seek_candidates), since SQLite does not narrow
+    # a row-value comparison on the rowid.
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # Bumped on every update; identifies the rendered state of the row
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     owner = relationship("User", back_populates="items")
+
+
+class Counter(Base):
+    """Named running totals kept up to date by triggers (see database.COUNTER_DDL)."""
+
+    __tablename__ = "counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class ItemChange(Base):
+    """Append-only log of item writes, filled by triggers (see database.CHANGELOG_DDL).
+
+    seq is AUTOINCREMENT so sequence numbers are never reused after compaction.
+    item_id has no foreign key: delete entries outlive the item they describe.
+    """
+
+    __tablename__ = "item_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True)
+    item_id = Column(Integer, nullable=False, index=True)
+    # insert, update or delete
+    op = Column(String(6), nullable=False)
+
+
+# FTS5 index over items.title/description, created and kept in sync by
+# database.init_db. The hidden column named after the table takes MATCH.
+items_fts = table("items_fts", column("rowid", Integer), column("rank"), column("items_fts"))
+
+# Per-term document counts of items_fts, used to estimate search totals
+items_fts_vocab = table("items_fts_vocab", column("term"), column("doc", Integer))
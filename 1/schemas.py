@@ -57,6 +57,67 @@ class ItemOut(ItemBase):
 
 class ItemList(BaseModel):
     items: List[ItemOut]
-    total: int
+    # None when the client passed include_total=false
+    total: Optional[int]
+    # True when total was estimated from index statistics (searches)
+    total_is_estimate: bool = False
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
+
+
+class ItemChange(BaseModel):
+    seq: int
+    # insert, update or delete; clients should apply insert/update as an upsert
+    op: str
+    item_id: int
+    # current state of the item, None once it has been deleted
+    item: Optional[ItemOut] = None
+
+
+class ItemChangeBatch(BaseModel):
+    changes: List[ItemChange]
+    # pass as since to fetch the next batch
+    next_since: int
+    has_more: bool
+    # newest sequence number in the log when the batch was read
+    head: int
+
+
+class ItemBulkError(BaseModel):
+    # position of the row in the request body
+    index: int
+    errors: List[dict]
+
+
+class ItemBulkResult(BaseModel):
+    created: int
+    failed: int
+    # new item id per input row, None for rows that failed
+    ids: List[Optional[int]]
+    errors: List[ItemBulkError]
+    # False when malformed input stopped the import before the end of the body
+    complete: bool = True
+
+
+class ItemBatchRequest(BaseModel):
+    ids: List[int]
+
+
+class ItemBatch(BaseModel):
+    # requested items in request order, each id once
+    items: List[ItemOut]
+    # requested ids that do not exist
+    missing: List[int]
+
+
+class ItemBulkUpdate(BaseModel):
+    ids: List[int]
+    changes: ItemUpdate
+
+
+class ItemBulkWriteResult(BaseModel):
+    # items that were changed, in request order
+    ids: List[int]
+    # requested ids that do not exist or belong to someone else
+    skipped: List[int]
@@ -0,0 +1,151 @@
+import itertools
+import os
+import sys
+import tempfile
+
+# The app modules read their configuration at import time, so the test
+# database has to be chosen before anything below imports them.
+_db_dir = tempfile.mkdtemp(prefix="items-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/test.db"
+os.environ.setdefault("CHANGE_LOG_COMPACT_INTERVAL_SECONDS", "0")
+os.environ.setdefault("AUTH_SIGNING_KEYS", "test:test-signing-key")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+
+_usernames = (f"user{n}" for n in itertools.count(1))
+
+
+@pytest.fixture(scope="session")
+def client():
+    import main
+
+    # one client, and so one event loop, for the whole run: the pooled
+    # aiosqlite connections are bound to the loop that opened them
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def run(client):
+    """Call an async function on the app's event loop and return its result."""
+
+    def run(fn, *args):
+        return client.portal.call(fn, *args)
+
+    return run
+
+
+def _register(client):
+    username = next(_usernames)
+    client.post("/users/", json={"username": username, "password": "secret1"})
+    token = client.post("/token", data={"username": username, "password": "secret1"}).json()["access_token"]
+    return {"username": username, "headers": {"Authorization": f"Bearer {token}"}}
+
+
+@pytest.fixture
+def user(client):
+    """A freshly registered user with a bearer token header."""
+    return _register(client)
+
+
+@pytest.fixture
+def other_user(client):
+    """A second freshly registered user, e.g. to check ownership rules."""
+    return _register(client)
+
+
+@pytest.fixture
+def make_items(client):
+    """Create ``n`` items for ``user`` through the bulk endpoint and return their ids."""
+
+    def make_items(user, n, title="item"):
+        rows = [{"title": f"{title} {i}"} for i in range(n)]
+        return client.post("/items/bulk", json=rows, headers=user["headers"]).json()["ids"]
+
+    return make_items
+
+
+def _engines():
+    import database
+
+    engines = {database.writer_engine, database.reader_engine}
+    if database.aux_reader_engine is not None:
+        engines.add(database.aux_reader_engine)
+    if database.export_engine is not None:
+        engines.add(database.export_engine)
+    return engines
+
+
+@pytest.fixture
+def capture_statements():
+    """Context manager recording (statement, parameters) for every SQL statement executed while it is open."""
+    import contextlib
+
+    from sqlalchemy import event
+
+    @contextlib.contextmanager
+    def capture_statements():
+        statements: list[tuple[str, object]] = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        engines = _engines()
+        for engine in engines:
+            event.listen(engine.sync_engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            for engine in engines:
+                event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    return capture_statements
+
+
+@pytest.fixture
+def count_statements(capture_statements):
+    """Context manager counting the SQL statements executed on every engine while it is open."""
+    import contextlib
+
+    @contextlib.contextmanager
+    def count_statements():
+        statements: list[str] = []
+        with capture_statements() as captured:
+            yield statements
+        statements.extend(statement for statement, _ in captured)
+
+    return count_statements
+
+
+@pytest.fixture
+def count_vm_steps():
+    """Run a captured statement on the test database and return how many SQLite VM instructions it took.
+
+    The count grows with the rows a statement visits, so it tells an exact
+    index seek apart from one that walks part of the index first.
+    """
+    import sqlite3
+
+    from sqlalchemy import make_url
+
+    import database
+
+    def count_vm_steps(statement, parameters=()):
+        steps = 0
+
+        def step():
+            nonlocal steps
+            steps += 1
+            return 0
+
+        raw = sqlite3.connect(make_url(database.DATABASE_URL).database)
+        raw.set_progress_handler(step, 1)
+        try:
+            raw.execute(statement, parameters or ()).fetchall()
+        finally:
+            raw.close()
+        return steps
+
+    return count_vm_steps
@@ -0,0 +1,96 @@
+import pytest
+
+import auth
+from schemas import UserOut
+
+ALICE = UserOut(id=42, username="alice42", full_name="Alice")
+
+
+@pytest.fixture
+def rotated_keys(monkeypatch):
+    """Sign with a new key "k2" while the previous key "k1" still verifies."""
+    monkeypatch.setattr(auth, "SIGNING_KEYS", {"k2": b"new-secret", "k1": b"old-secret"})
+    monkeypatch.setattr(auth, "ACTIVE_KEY_ID", "k2")
+
+
+def _sign_with(kid: str, now: float | None = None) -> str:
+    active = auth.ACTIVE_KEY_ID
+    auth.ACTIVE_KEY_ID = kid
+    try:
+        return auth.issue_access_token(ALICE, now=now)
+    finally:
+        auth.ACTIVE_KEY_ID = active
+
+
+def test_issued_token_verifies():
+    assert auth.verify_access_token(auth.issue_access_token(ALICE)) == ALICE
+
+
+def test_forged_signature_is_rejected():
+    version, kid, body, signature = auth.issue_access_token(ALICE).split(".")
+    other = auth.issue_access_token(UserOut(id=1, username="mallory", full_name=None)).split(".")[2]
+    assert auth.verify_access_token(f"{version}.{kid}.{other}.{signature}") is None
+    assert auth.verify_access_token(f"{version}.{kid}.{body}.{signature[:-2]}xx") is None
+
+
+def test_expired_token_is_rejected():
+    token = auth.issue_access_token(ALICE, now=1_000)
+    assert auth.verify_access_token(token, now=1_000 + auth.ACCESS_TOKEN_TTL_SECONDS - 1) == ALICE
+    assert auth.verify_access_token(token, now=1_000 + auth.ACCESS_TOKEN_TTL_SECONDS + 1) is None
+
+
+def test_rotated_keys(rotated_keys):
+    assert auth.verify_access_token(_sign_with("k1")) == ALICE
+    assert auth.issue_access_token(ALICE).split(".")[1] == "k2"
+    # a token naming a key that is no longer configured
+    retired = _sign_with("k1").replace(".k1.", ".k0.", 1)
+    assert auth.verify_access_token(retired) is None
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        "",
+        "v1",
+        "v1.test.abc",
+        "v2.test.abc.def",
+        "v1.test.abc.\xe9",
+        "v1.d\xe9v.abc.def",
+        "v1.test.!!!.def",
+        "v1.test.abc.def.ghi",
+    ],
+)
+def test_malformed_token_is_rejected(token):
+    assert auth.verify_access_token(token) is None
+
+
+def test_malformed_signed_token_gets_401(client):
+    response = client.get("/protected", headers={"Authorization": "Bearer v1.test.abc.\xe9".encode("latin-1")})
+    assert response.status_code == 401
+
+
+def test_signed_token_is_accepted(client, user):
+    response = client.get("/users/me", headers=user["headers"])
+    assert response.status_code == 200
+    assert response.json()["username"] == user["username"]
+
+
+def test_unsigned_legacy_token_is_rejected(client, user):
+    headers = {"Authorization": f"Bearer token-{user['username']}"}
+    assert client.get("/protected", headers=headers).status_code == 401
+    assert client.put("/items/1", json={"title": "taken over"}, headers=headers).status_code == 401
+
+
+def test_legacy_token_only_with_explicit_opt_in(client, user, monkeypatch):
+    monkeypatch.setattr(auth, "ALLOW_LEGACY_TOKENS", True)
+    response = client.get("/users/me", headers={"Authorization": f"Bearer token-{user['username']}"})
+    assert response.json()["username"] == user["username"]
+
+
+def test_signing_keys_are_required(monkeypatch):
+    monkeypatch.delenv("AUTH_SIGNING_KEYS")
+    monkeypatch.delenv("AUTH_INSECURE_DEV_KEY", raising=False)
+    with pytest.raises(RuntimeError):
+        auth._load_signing_keys()
+    monkeypatch.setenv("AUTH_INSECURE_DEV_KEY", "1")
+    assert list(auth._load_signing_keys()) == ["dev"]
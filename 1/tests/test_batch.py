@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import event
+
+import database
+import main
+
+
+@pytest.fixture
+def batch(client):
+    def batch(ids, method="GET"):
+        if method == "GET":
+            return client.get("/items/batch", params={"ids": ",".join(map(str, ids))})
+        return client.post("/items/batch", json={"ids": ids})
+
+    return batch
+
+
+@pytest.mark.parametrize("method", ["GET", "POST"])
+def test_batch_keeps_request_order_and_reports_missing(batch, user, make_items, method):
+    first, second, third = make_items(user, 3, title="batched")
+    missing = third + 1_000_000
+    body = batch([third, missing, first, third, second, first], method).json()
+    assert [item["id"] for item in body["items"]] == [third, first, second]
+    assert [item["title"] for item in body["items"]] == ["batched 2", "batched 0", "batched 1"]
+    assert body["missing"] == [missing]
+
+
+@pytest.mark.parametrize("method", ["GET", "POST"])
+def test_batch_size_is_capped(batch, monkeypatch, method):
+    monkeypatch.setattr(main, "ITEM_BATCH_MAX_SIZE", 3)
+    assert batch([1, 2, 3, 3], method).status_code == 200
+    assert batch([1, 2, 3, 4], method).status_code == 400
+
+
+def test_get_batch_rejects_non_integer_ids(client):
+    assert client.get("/items/batch", params={"ids": "1,x"}).status_code == 400
+
+
+def test_post_batch_reads_without_the_writer(batch, user, make_items):
+    ids = make_items(user, 2, title="read only")
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.writer_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        assert batch(ids, "POST").status_code == 200
+    finally:
+        event.remove(database.writer_engine.sync_engine, "before_cursor_execute", record)
+    assert statements == []
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+import main
+
+
+def _post(client, user, body: bytes, content_type: str):
+    return client.post("/items/bulk", content=body, headers={**user["headers"], "Content-Type": content_type})
+
+
+def _assert_consistent(result):
+    assert result["created"] + result["failed"] == len(result["ids"])
+    assert result["failed"] == len(result["errors"])
+    assert sorted(error["index"] for error in result["errors"]) == [
+        index for index, new_id in enumerate(result["ids"]) if new_id is None
+    ]
+
+
+def test_ndjson_import_goes_on_after_a_line_that_is_not_json(client, user, monkeypatch):
+    monkeypatch.setattr(main, "BULK_INSERT_CHUNK_SIZE", 2)
+    lines = ['{"title": "bulk one"}', '{"title": "bulk', '{"title": "x"}', '{"title": "bulk two"}', '{"title": "bulk three"}']
+    result = _post(client, user, "\n".join(lines).encode(), "application/x-ndjson").json()
+    _assert_consistent(result)
+    assert result["complete"] is True
+    assert (result["created"], result["failed"]) == (3, 2)
+    assert [error["index"] for error in result["errors"]] == [1, 2]
+    assert result["errors"][0]["errors"][0]["type"] == "json_invalid"
+    assert result["ids"][0] < result["ids"][3] < result["ids"][4]
+    titles = [client.get(f"/items/{result['ids'][i]}").json()["title"] for i in (0, 3, 4)]
+    assert titles == ["bulk one", "bulk two", "bulk three"]
+
+
+def test_malformed_array_stops_the_import_and_is_counted(client, user, monkeypatch):
+    monkeypatch.setattr(main, "BULK_INSERT_CHUNK_SIZE", 2)
+    rows = [{"title": f"arrayed {i}"} for i in range(3)]
+    body = json.dumps(rows)[:-1].encode() + b', {"title": "arrayed 3"} {"title": "lost"}]'
+    result = _post(client, user, body, "application/json").json()
+    _assert_consistent(result)
+    assert result["complete"] is False
+    assert (result["created"], result["failed"]) == (4, 1)
+    assert result["errors"][0]["index"] == 4
+
+
+@pytest.mark.parametrize("content_type", ["application/json", "application/x-ndjson"])
+def test_rows_failing_validation_are_reported_in_place(client, user, content_type):
+    rows = [{"title": "valid row"}, {"title": "no"}, {"description": "untitled"}, {"title": "valid too"}]
+    if content_type == "application/json":
+        body = json.dumps(rows).encode()
+    else:
+        body = "".join(json.dumps(row) + "\n" for row in rows).encode()
+    result = _post(client, user, body, content_type).json()
+    _assert_consistent(result)
+    assert result["complete"] is True
+    assert [new_id is None for new_id in result["ids"]] == [False, True, True, False]
+    assert result["errors"][1]["errors"][0]["loc"] == ["title"]
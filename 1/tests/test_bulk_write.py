@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import event
+
+import crud
+import database
+
+
+def _bulk_delete(client, user, ids):
+    return client.request("DELETE", "/items/bulk", json={"ids": ids}, headers=user["headers"])
+
+
+def test_bulk_writes_skip_items_of_other_users(client, user, other_user, make_items):
+    mine = make_items(user, 3, title="mine")
+    theirs = make_items(other_user, 2, title="theirs")
+    missing = mine[-1] + 1_000_000
+    requested = [theirs[0], mine[0], missing, mine[1], theirs[1], mine[0]]
+
+    body = {"ids": requested, "changes": {"title": "taken"}}
+    patched = client.patch("/items/bulk", json=body, headers=user["headers"])
+    assert patched.json() == {"ids": [mine[0], mine[1]], "skipped": [theirs[0], missing, theirs[1]]}
+    deleted = _bulk_delete(client, user, requested).json()
+    assert deleted == {"ids": [mine[0], mine[1]], "skipped": [theirs[0], missing, theirs[1]]}
+
+    assert [client.get(f"/items/{item_id}").json()["title"] for item_id in theirs] == ["theirs 0", "theirs 1"]
+    assert client.get(f"/items/{mine[2]}").json()["title"] == "mine 2"
+
+
+def test_bulk_writes_past_one_chunk(client, user, other_user, make_items, count_statements):
+    mine = make_items(user, crud.ID_BATCH_CHUNK_SIZE + 20, title="chunked")
+    theirs = make_items(other_user, 1, title="not chunked")
+    requested = mine[:10] + theirs + mine[10:]
+
+    with count_statements() as statements:
+        body = {"ids": requested, "changes": {"title": "rechunked"}}
+        patched = client.patch("/items/bulk", json=body, headers=user["headers"])
+    assert patched.json() == {"ids": mine, "skipped": theirs}
+    updates = [statement for statement in statements if statement.startswith("UPDATE items")]
+    assert len(updates) == 2
+    assert client.get(f"/items/{mine[-1]}").json()["title"] == "rechunked"
+
+    deleted = _bulk_delete(client, user, requested).json()
+    assert deleted == {"ids": mine, "skipped": theirs}
+    assert client.get(f"/items/{mine[-1]}").status_code == 404
+
+
+@pytest.mark.parametrize("method", ["PATCH", "DELETE"])
+def test_bulk_write_failing_in_a_later_chunk_changes_nothing(client, user, make_items, monkeypatch, method):
+    monkeypatch.setattr(crud, "ID_BATCH_CHUNK_SIZE", 2)
+    ids = make_items(user, 5, title="atomic")
+    seen = 0
+
+    def fail_third_chunk(conn, cursor, statement, parameters, context, executemany):
+        nonlocal seen
+        if statement.startswith(("UPDATE items", "DELETE FROM items")):
+            seen += 1
+            if seen == 3:
+                raise RuntimeError("disk on fire")
+
+    engine = database.writer_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", fail_third_chunk)
+    try:
+        with pytest.raises(RuntimeError, match="disk on fire"):
+            if method == "PATCH":
+                body = {"ids": ids, "changes": {"title": "half done"}}
+                client.patch("/items/bulk", json=body, headers=user["headers"])
+            else:
+                _bulk_delete(client, user, ids)
+    finally:
+        event.remove(engine, "before_cursor_execute", fail_third_chunk)
+
+    # the first two chunks were rolled back with the third
+    assert seen == 3
+    assert [client.get(f"/items/{item_id}").json()["title"] for item_id in ids] == [f"atomic {i}" for i in range(5)]
@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+import crud
+from cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_concurrent_misses_share_one_load():
+    calls = 0
+
+    async def main():
+        cache = TTLCache(maxsize=8, ttl=10)
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(cache.get_or_load("k", load) for _ in range(5)))
+        return results, cache.stats()
+
+    results, stats = asyncio.run(main())
+    assert results == ["value"] * 5
+    assert calls == 1
+    assert stats["coalesced"] == 4 and stats["size"] == 1
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    async def main():
+        cache = TTLCache(maxsize=8, ttl=10)
+        release = asyncio.Event()
+
+        async def load():
+            await release.wait()
+            return "value"
+
+        leader = asyncio.create_task(cache.get_or_load("k", load))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load("k", load))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        value = await waiter
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return value, cache.get("k")
+
+    assert asyncio.run(main()) == ("value", "value")
+
+
+def test_load_failure_reaches_every_waiter_and_is_not_cached():
+    async def main():
+        cache = TTLCache(maxsize=8, ttl=10)
+
+        async def load():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(*(cache.get_or_load("k", load) for _ in range(3)), return_exceptions=True)
+        return results, cache.get("k")
+
+    results, cached = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cached is None
+
+
+def test_invalidate_during_load_discards_the_result():
+    async def main():
+        cache = TTLCache(maxsize=8, ttl=10)
+
+        async def load():
+            cache.invalidate("k")
+            return "stale"
+
+        value = await cache.get_or_load("k", load)
+        return value, cache.get("k")
+
+    assert asyncio.run(main()) == ("stale", None)
+
+
+def test_callers_after_invalidate_do_not_join_the_stale_load():
+    async def main():
+        cache = TTLCache(maxsize=8, ttl=10)
+        releases = [asyncio.Event(), asyncio.Event()]
+        values = iter(["before", "after"])
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            release = releases[calls]
+            calls += 1
+            value = next(values)
+            await release.wait()
+            return value
+
+        first = asyncio.create_task(cache.get_or_load("k", load))
+        await asyncio.sleep(0)
+        cache.invalidate("k")
+        second = asyncio.create_task(cache.get_or_load("k", load))
+        await asyncio.sleep(0)
+        # the stale load finishing must neither store its value nor unregister the fresh load
+        releases[0].set()
+        assert await first == "before"
+        third = asyncio.create_task(cache.get_or_load("k", load))
+        releases[1].set()
+        return await second, await third, calls, cache.get("k"), cache.coalesced
+
+    assert asyncio.run(main()) == ("after", "after", 2, "after", 1)
+
+
+def test_fragment_put_late_for_a_deleted_item_is_never_served(client, user, make_items):
+    (item_id,) = make_items(user, 1, title="deleted")
+    client.get(f"/items/{item_id}")
+    assert client.delete(f"/items/{item_id}", headers=user["headers"]).status_code == 200
+    # a reader that loaded the row before the delete caches it afterwards
+    crud.item_fragments.put(item_id, 1, 0, b'{"title":"deleted 0"}')
+
+    created = client.post("/items/", json={"title": "recreated"}, headers=user["headers"]).json()
+    assert client.get(f"/items/{created['id']}").json()["title"] == "recreated"
+    listed = client.get("/items/", params={"q": "recreated"}).json()["items"]
+    assert [item["title"] for item in listed] == ["recreated"]
@@ -0,0 +1,159 @@
+import asyncio
+
+import crud
+import database
+import main
+import schemas
+from broadcast import ChangeBroker
+
+
+def _head(run) -> int:
+    async def head():
+        async with database.ReadSessionLocal() as db:
+            return await crud.get_change_head(db)
+
+    return run(head)
+
+
+def _compact(run, max_entries: int) -> int:
+    async def compact():
+        async with database.AsyncSessionLocal() as db:
+            return await crud.compact_changes(db, max_entries=max_entries)
+
+    return run(compact)
+
+
+def _event_ids(chunk: bytes) -> list[int]:
+    return [int(line[4:]) for line in chunk.decode().splitlines() if line.startswith("id: ")]
+
+
+def test_writes_are_logged_in_order(client, run, user):
+    headers = user["headers"]
+    since = _head(run)
+    first, second = client.post("/items/bulk", json=[{"title": "logged 1"}, {"title": "logged 2"}], headers=headers).json()["ids"]
+    client.put(f"/items/{first}", json={"title": "logged again"}, headers=headers)
+    client.delete(f"/items/{second}", headers=headers)
+
+    body = client.get("/items/changes", params={"since": since}).json()
+    assert [(change["op"], change["item_id"]) for change in body["changes"]] == [
+        ("insert", first), ("insert", second), ("update", first), ("delete", second),
+    ]  # fmt: skip
+    assert body["changes"][2]["item"]["title"] == "logged again"
+    assert body["changes"][3]["item"] is None
+    assert body["next_since"] == body["head"] == body["changes"][-1]["seq"]
+
+
+def test_compaction_keeps_latest_entries_then_raises_the_floor(client, run, user):
+    headers = user["headers"]
+    since = _head(run)
+    kept = client.post("/items/", json={"title": "compacted"}, headers=headers).json()["id"]
+    client.put(f"/items/{kept}", json={"title": "compacted again"}, headers=headers)
+    newest = client.post("/items/", json={"title": "newest"}, headers=headers).json()["id"]
+
+    # without a size limit only superseded entries go, and nothing is lost
+    _compact(run, max_entries=1_000_000)
+    changes = client.get("/items/changes", params={"since": since}).json()["changes"]
+    assert [(change["op"], change["item_id"]) for change in changes] == [("update", kept), ("insert", newest)]
+
+    # over the limit the oldest entries go as well, and readers behind them must resync
+    _compact(run, max_entries=1)
+    response = client.get("/items/changes", params={"since": since})
+    assert response.status_code == 410
+    floor = changes[0]["seq"]
+    changes = client.get("/items/changes", params={"since": floor}).json()["changes"]
+    assert [change["item_id"] for change in changes] == [newest]
+
+
+def test_stream_replays_from_last_event_id_then_follows_live(run, user, make_items):
+    since = _head(run)
+    missed = make_items(user, 3, title="missed")
+
+    async def reconnect():
+        stream = main._change_stream(since)
+        try:
+            assert await anext(stream) == b": connected\n\n"
+            replayed = await anext(stream)
+            async with database.AsyncSessionLocal() as db:
+                live = await crud.create_item(db, schemas.ItemCreate(title="live"), user["username"])
+            return replayed, await asyncio.wait_for(anext(stream), 5), live.id
+        finally:
+            await stream.aclose()
+
+    replayed, followed, live_id = run(reconnect)
+    seqs = _event_ids(replayed)
+    assert len(seqs) == len(missed) and seqs[0] > since
+    for item_id in missed:
+        assert f'"item_id":{item_id},'.encode() in replayed
+    assert _event_ids(followed)[0] > seqs[-1]
+    assert f'"item_id":{live_id},'.encode() in followed
+
+
+def test_stream_asks_readers_behind_the_floor_to_resync(client, run, user):
+    client.post("/items/", json={"title": "floor raiser"}, headers=user["headers"])
+    _compact(run, max_entries=1)
+
+    async def reconnect():
+        stream = main._change_stream(0)
+        try:
+            return [chunk async for chunk in stream]
+        finally:
+            await stream.aclose()
+
+    assert run(reconnect) == [b": connected\n\n", b"event: resync\ndata: {}\n\n"]
+
+
+def test_stream_ends_for_a_subscriber_whose_buffer_overflows(run, monkeypatch, user):
+    monkeypatch.setattr(crud.change_broker, "queue_size", 1)
+
+    async def fall_behind():
+        stream = main._change_stream(None)
+        try:
+            assert await anext(stream) == b": connected\n\n"
+            dropped_before = crud.change_broker.dropped
+            # two log entries published in one go overflow a buffer of one
+            async with database.AsyncSessionLocal() as db:
+                await crud.create_items(db, [schemas.ItemCreate(title=f"flood {i}") for i in range(2)], user["username"])
+            chunks = [chunk async for chunk in stream]
+            return chunks, crud.change_broker.dropped - dropped_before
+        finally:
+            await stream.aclose()
+
+    chunks, dropped = run(fall_behind)
+    # what was buffered before the drop is still delivered, then the stream ends
+    assert len(chunks) == 1 and len(_event_ids(chunks[0])) == 1
+    assert dropped == 1
+
+
+def test_broker_drops_only_the_full_subscriber(run):
+    async def publish():
+        broker = ChangeBroker(queue_size=2, poll_interval=60)
+        slow, fast = broker.subscribe(), broker.subscribe()
+        received = []
+        for seq in (1, 2, 3):
+            broker._publish(seq, b"event %d" % seq)
+            received.append(await fast.get())
+        slow_events = [await slow.get() for _ in range(3)]
+        return received, slow_events, broker.stats()
+
+    received, slow_events, stats = run(publish)
+    assert [seq for seq, _ in received] == [1, 2, 3]
+    assert slow_events == [(1, b"event 1"), (2, b"event 2"), None]
+    assert stats == {"subscribers": 1, "last_seq": 3, "published": 3, "dropped": 1}
+
+
+def test_broker_stops_even_if_a_load_swallows_the_cancellation(run):
+    async def start_and_stop():
+        broker = ChangeBroker(queue_size=2, poll_interval=0.01)
+
+        async def head():
+            try:
+                await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                pass
+            return 0
+
+        broker.start(None, head, 0)
+        await asyncio.sleep(0.02)
+        await asyncio.wait_for(broker.stop(), 5)
+
+    run(start_and_stop)
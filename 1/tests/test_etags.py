@@ -0,0 +1,50 @@
+import sqlite3
+
+from sqlalchemy import create_engine
+
+import database
+
+
+def test_deleted_item_id_is_not_reused(client, user, make_items):
+    headers = user["headers"]
+    first, last = make_items(user, 2, title="tagged")
+    etag = client.get(f"/items/{last}").headers["ETag"]
+    assert client.delete(f"/items/{last}", headers=headers).status_code == 200
+
+    created = client.post("/items/", json={"title": "tagged again"}, headers=headers)
+    assert created.json()["id"] > last
+    assert created.headers["ETag"] != etag
+    # validators for the deleted item no longer match anything
+    assert client.get(f"/items/{last}", headers={"If-None-Match": etag}).status_code == 404
+    stale_write = client.put(f"/items/{last}", json={"title": "retitled"}, headers={**headers, "If-Match": etag})
+    assert stale_write.status_code == 404
+
+
+def test_existing_items_table_is_rebuilt_with_autoincrement(tmp_path):
+    path = tmp_path / "legacy.db"
+    raw = sqlite3.connect(path)
+    raw.executescript(
+        """
+        CREATE TABLE items (
+            id INTEGER NOT NULL PRIMARY KEY, title VARCHAR(200) NOT NULL, description TEXT,
+            owner_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            version INTEGER DEFAULT '1' NOT NULL
+        );
+        INSERT INTO items (id, title, owner_id, version) VALUES (1, 'kept', 1, 3), (2, 'kept too', 1, 1);
+        """
+    )
+    raw.close()
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        database.Base.metadata.create_all(conn)
+        # item 5 was deleted before the upgrade; only the change log remembers it
+        conn.exec_driver_sql("INSERT INTO item_changes (item_id, op) VALUES (5, 'delete')")
+        database._add_autoincrement(conn)
+    with engine.begin() as conn:
+        sql = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'items'").scalar_one()
+        assert "AUTOINCREMENT" in sql
+        rows = conn.exec_driver_sql("SELECT id, title, version FROM items ORDER BY id").all()
+        assert [tuple(row) for row in rows] == [(1, "kept", 3), (2, "kept too", 1)]
+        conn.exec_driver_sql("INSERT INTO items (title, owner_id) VALUES ('new', 1)")
+        assert conn.exec_driver_sql("SELECT max(id) FROM items").scalar_one() == 6
+    engine.dispose()
@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+import pytest
+
+import database
+import main
+
+
+def test_open_exports_do_not_starve_reads(client, run, monkeypatch, user, make_items):
+    # as many open exports as the read pool has connections
+    monkeypatch.setattr(main, "_export_slots", asyncio.Semaphore(database.READ_POOL_SIZE))
+    make_items(user, 3, title="exported")
+
+    async def open_exports(count):
+        streams = [main._export_stream(None, None, "ndjson", False) for _ in range(count)]
+        # each stream now waits at its first chunk with its session open
+        for stream in streams:
+            await anext(stream)
+        return streams
+
+    async def close(streams):
+        for stream in streams:
+            await stream.aclose()
+
+    streams = run(open_exports, database.READ_POOL_SIZE)
+    try:
+        started = time.monotonic()
+        for _ in range(database.READ_POOL_SIZE + 1):
+            assert client.get("/items/", params={"q": "exported"}).status_code == 200
+        assert time.monotonic() - started < 5
+    finally:
+        run(close, streams)
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, gzipped",
+    [
+        ("gzip", True),
+        ("deflate, GZIP;q=0.5", True),
+        ("*", True),
+        ("gzip;q=0", False),
+        ("gzip; q=0.000, *", False),
+        ("*;q=0", False),
+        ("br, *;q=0", False),
+        ("identity", False),
+        ("", False),
+    ],
+)
+def test_export_is_gzipped_only_when_accepted(client, user, make_items, accept_encoding, gzipped):
+    make_items(user, 2, title="encoded")
+    response = client.get("/items/export", params={"q": "encoded"}, headers={"Accept-Encoding": accept_encoding})
+    assert response.status_code == 200
+    assert response.headers.get("Content-Encoding") == ("gzip" if gzipped else None)
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.text.count("encoded") >= 2
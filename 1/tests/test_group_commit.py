@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import text
+
+import crud
+import schemas
+from batching import GroupCommitter
+from database import AsyncSessionLocal
+
+
+async def _create(title: str, username: str):
+    async with AsyncSessionLocal() as db:
+        return await crud.create_item(db, schemas.ItemCreate(title=title), username)
+
+
+@pytest.fixture
+def group_commit(monkeypatch):
+    committer = GroupCommitter(AsyncSessionLocal, crud._insert_item, window=0.005, max_items=64)
+    monkeypatch.setattr(crud, "item_group_committer", committer)
+    return committer
+
+
+def test_create_with_cold_user_cache_does_not_deadlock(client, user, group_commit):
+    crud.user_cache.clear()
+    started = time.monotonic()
+    response = client.post("/items/", json={"title": "grouped"}, headers=user["headers"])
+    assert response.status_code == 200
+    assert time.monotonic() - started < 5
+    assert group_commit.stats()["items"] == 1
+
+
+def test_create_on_a_session_holding_the_writer(run, user, group_commit):
+    async def create():
+        async with AsyncSessionLocal() as db:
+            # an open transaction holds the only writer connection
+            await db.execute(text("SELECT 1 FROM items LIMIT 1"))
+            return await asyncio.wait_for(
+                crud.create_item(db, schemas.ItemCreate(title="grouped"), user["username"]), timeout=5
+            )
+
+    assert run(create).title == "grouped"
+
+
+def test_batch_is_committed_once(run, user, group_commit, monkeypatch):
+    import sqlite3
+
+    from sqlalchemy import make_url
+
+    import database
+
+    outside = sqlite3.connect(make_url(database.DATABASE_URL).database, check_same_thread=False)
+    # PRAGMA data_version changes whenever another connection commits
+    before = outside.execute("PRAGMA data_version").fetchone()[0]
+    seen_during_batch = []
+
+    async def write(db, values):
+        seen_during_batch.append(
+            (
+                outside.execute("PRAGMA data_version").fetchone()[0],
+                outside.execute("SELECT count(*) FROM items WHERE title = 'batched'").fetchone()[0],
+            )
+        )
+        return await crud._insert_item(db, values)
+
+    monkeypatch.setattr(group_commit, "write", write)
+
+    async def create_five():
+        return await asyncio.gather(
+            *(_create("batched", user["username"]) for _ in range(5))
+        )
+
+    rows = run(create_five)
+    after = outside.execute("PRAGMA data_version").fetchone()[0]
+    committed = outside.execute("SELECT count(*) FROM items WHERE title = 'batched'").fetchone()[0]
+    outside.close()
+
+    assert len(rows) == 5 and group_commit.stats()["batches"] == 1
+    # no commit happened between the rows of the batch, and none of them was visible
+    assert seen_during_batch == [(before, 0)] * 5
+    assert after != before and committed == 5
+
+
+def test_failing_row_only_fails_its_caller(run, user, group_commit, monkeypatch):
+    async def write(db, values):
+        if values["title"] == "rejected":
+            await crud._insert_item(db, values)
+            raise RuntimeError("rejected")
+        return await crud._insert_item(db, values)
+
+    monkeypatch.setattr(group_commit, "write", write)
+
+    async def create():
+        titles = ["kept one", "rejected", "kept two"]
+        return await asyncio.gather(
+            *(_create(title, user["username"]) for title in titles),
+            return_exceptions=True,
+        )
+
+    kept_one, rejected, kept_two = run(create)
+    assert isinstance(rejected, RuntimeError)
+    assert kept_one.title == "kept one" and kept_two.title == "kept two"
+
+    async def titles():
+        async with AsyncSessionLocal() as db:
+            res = await db.execute(
+                text("SELECT title FROM items WHERE title IN ('kept one', 'rejected', 'kept two') ORDER BY id")
+            )
+            return res.scalars().all()
+
+    assert run(titles) == ["kept one", "kept two"]
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+import jsonstream
+
+
+def _values(rng: random.Random, count: int) -> list:
+    atoms = [0, -17, 3.25, 1e21, True, False, None, "", "plain", "ünïcødé ✓", 'quote " and \\ slash', "[,]{:}"]
+
+    def value(depth):
+        kind = rng.randrange(4 if depth < 3 else 2)
+        if kind == 0:
+            return rng.choice(atoms)
+        if kind == 1:
+            return rng.randrange(-(10**12), 10**12)
+        if kind == 2:
+            return [value(depth + 1) for _ in range(rng.randrange(4))]
+        return {f"k{n}": value(depth + 1) for n in range(rng.randrange(4))}
+
+    return [value(0) for _ in range(count)]
+
+
+def _chunked(body: bytes, rng: random.Random) -> list[bytes]:
+    # cuts at random bytes, so also inside numbers, strings and multi-byte characters
+    cuts = sorted(rng.sample(range(1, len(body)), min(len(body) - 1, rng.randrange(1, 40))))
+    return [body[start:end] for start, end in zip([0, *cuts], [*cuts, len(body)])]
+
+
+def _collect(iterator_fn, chunks: list[bytes], **kwargs) -> list:
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        return [value async for value in iterator_fn(stream(), **kwargs)]
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_array_elements_survive_any_chunking(seed):
+    rng = random.Random(seed)
+    values = _values(rng, rng.randrange(0, 30))
+    body = json.dumps(values, ensure_ascii=False, indent=rng.choice([None, 1])).encode()
+    assert _collect(jsonstream.iter_json_array, _chunked(body, rng) if len(body) > 1 else [body]) == values
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_ndjson_values_survive_any_chunking(seed):
+    rng = random.Random(seed)
+    values = _values(rng, rng.randrange(1, 30))
+    lines = [json.dumps(value, ensure_ascii=False) for value in values]
+    body = ("\n".join(lines) + rng.choice(["", "\n", "\n\n"])).encode()
+    assert _collect(jsonstream.iter_ndjson, _chunked(body, rng)) == values
+
+
+@pytest.mark.parametrize(
+    "body",
+    [b"", b"{}", b"[1, 2", b"[1 2]", b"[1,]", b"[1] 2", b'["open]', b"[tru]", b"[1, 2]]"],
+)
+@pytest.mark.parametrize("seed", range(5))
+def test_malformed_arrays_raise_at_any_chunking(body, seed):
+    chunks = _chunked(body, random.Random(seed)) if len(body) > 1 else [body]
+    with pytest.raises(ValueError):
+        _collect(jsonstream.iter_json_array, chunks)
+
+
+def test_ndjson_lines_are_not_parsed():
+    body = b'{"a": 1}\n\nnot json\n  \n[2]'
+    assert _collect(jsonstream.iter_ndjson_lines, _chunked(body, random.Random(0))) == ['{"a": 1}', "not json", "[2]"]
+    with pytest.raises(json.JSONDecodeError):
+        _collect(jsonstream.iter_ndjson, [body])
+
+
+def test_overlong_values_are_refused_before_they_end():
+    with pytest.raises(ValueError, match="too long"):
+        _collect(jsonstream.iter_json_array, [b'["', b"x" * 64, b"x" * 64], max_value_chars=100)
+    with pytest.raises(ValueError, match="too long"):
+        _collect(jsonstream.iter_ndjson_lines, [b"1\n", b"x" * 64, b"x" * 64], max_value_chars=100)
@@ -0,0 +1,29 @@
+import pytest
+
+import crud
+
+
+@pytest.fixture(autouse=True)
+def hundred_items(user, make_items):
+    make_items(user, 100, title="counted")
+
+
+@pytest.mark.parametrize("read_path", ["core", "orm"])
+@pytest.mark.parametrize("owner_loading", ["contains_eager", "joined", "selectin"])
+@pytest.mark.parametrize("params", [{}, {"q": "counted"}, {"include_total": "false"}, {"sort_by": "title"}])
+def test_list_statement_count_does_not_grow_with_page_size(
+    client, count_statements, monkeypatch, read_path, owner_loading, params
+):
+    monkeypatch.setattr(crud, "ITEM_READ_PATH", read_path)
+    monkeypatch.setattr(crud, "OWNER_LOADING", owner_loading)
+    counts = {}
+    for limit in (1, 100):
+        with count_statements() as statements:
+            response = client.get("/items/", params={**params, "limit": limit})
+        assert response.status_code == 200
+        assert len(response.json()["items"]) == limit
+        counts[limit] = len(statements)
+    assert counts[1] == counts[100]
+    # page query, plus the total unless skipped, plus one owner query for selectin
+    expected = 1 + (params.get("include_total") != "false") + (read_path == "orm" and owner_loading == "selectin")
+    assert counts[100] == expected
@@ -0,0 +1,58 @@
+import pytest
+
+import crud
+
+
+def _total(client, **params):
+    body = client.get("/items/", params={**params, "limit": params.get("limit", 10)}).json()
+    return body["total"], body["total_is_estimate"], len(body["items"])
+
+
+def test_item_counter_follows_inserts_and_deletes(client, user, make_items):
+    before, estimated, _ = _total(client)
+    assert not estimated
+    ids = make_items(user, 5, title="counted")
+    client.post("/items/", json={"title": "counted single"}, headers=user["headers"])
+    assert _total(client)[0] == before + 6
+    client.delete(f"/items/{ids[0]}", headers=user["headers"])
+    client.request("DELETE", "/items/bulk", json={"ids": ids[1:3]}, headers=user["headers"])
+    assert _total(client)[0] == before + 3
+
+
+@pytest.mark.parametrize(
+    "q, tokens",
+    [
+        ("Café", ["cafe"]),
+        ("foo_bar", ["foo", "bar"]),
+        ("naïve-Résumé 42", ["naive", "resume", "42"]),
+        ("__", []),
+    ],
+)
+def test_fts_tokens_split_like_unicode61(q, tokens):
+    assert crud.fts_tokens(q) == tokens
+
+
+@pytest.mark.parametrize("description, q", [("Café", "café"), ("foo_bar", "foo_bar"), ("item items", "item")])
+def test_search_total_counts_the_matches_found(client, user, description, q):
+    # titles only allow ASCII, descriptions anything
+    client.post("/items/", json={"title": f"matched {user['username']}", "description": description}, headers=user["headers"])
+    assert _total(client, q=f"{q} {user['username']}") == (1, False, 1)
+
+
+def test_search_total_is_estimated_past_the_first_page(client, user, make_items):
+    word = f"estimated{user['username']}"
+    make_items(user, 25, title=word)
+    total, estimated, found = _total(client, q=word, limit=10)
+    assert (total, estimated, found) == (25, True, 10)
+    # the last page knows the exact total
+    assert _total(client, q=word, limit=10, offset=20) == (25, False, 5)
+
+
+def test_search_total_is_never_below_the_rows_found(client, user, make_items, monkeypatch):
+    async def underestimate(db, q):
+        return 0
+
+    monkeypatch.setattr(crud, "estimate_matches", underestimate)
+    word = f"floor{user['username']}"
+    make_items(user, 25, title=word)
+    assert _total(client, q=word, limit=10, offset=10) == (20, True, 10)